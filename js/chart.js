@@ -8,6 +8,11 @@ const scholarInterestsElement = document.getElementById('scholar-interests');
 const metricsGridElement = document.getElementById('metrics-grid');
 const lastUpdatedElement = document.getElementById('last-updated');
 const citationChartElement = document.getElementById('citation-chart');
+const chartEmptyElement = document.getElementById('chart-empty');
+const profileSelectElement = document.getElementById('profile-select');
+
+// Manifest of per-profile shards written by `get_scholar_stats.py --sharded`
+const manifestUrl = new URL('data/manifest.json', document.baseURI);
 
 // Citation chart instance
 let citationChart;
@@ -15,6 +20,23 @@ let citationChart;
 // Fetch the scholar stats data
 async function fetchScholarStats() {
     try {
+        // Sharded output: load the small manifest, then only the selected profile
+        const manifest = await fetchManifest();
+        if (manifest && Object.keys(manifest.profiles || {}).length > 0) {
+            const requestedId = new URLSearchParams(window.location.search).get('user');
+            const scholarId = requestedId in manifest.profiles ? requestedId : Object.keys(manifest.profiles)[0];
+            setupProfileSelector(manifest, scholarId);
+            await loadProfileShard(manifest, scholarId);
+            return;
+        }
+        
+        // Prefer the minified, chart-ready payload written by the Python script
+        const payload = await fetchDashboardPayload();
+        if (payload) {
+            displayDashboardPayload(payload);
+            return;
+        }
+        
         const response = await fetch('data/scholar_stats.json');
         
         if (!response.ok) {
@@ -24,19 +46,108 @@ async function fetchScholarStats() {
         const data = await response.json();
         displayScholarStats(data);
     } catch (error) {
-        console.error('Error fetching scholar stats:', error);
-        
-        // Display error message on the page
-        document.querySelector('.container').innerHTML = `
-            <div class="error-message">
-                <h2>Error Loading Data</h2>
-                <p>Could not load scholar statistics. Please try again later.</p>
-                <p>Error details: ${error.message}</p>
-            </div>
-        `;
+        showLoadError(error);
+    }
+}
+
+// Display an error message in place of the page content
+function showLoadError(error) {
+    console.error('Error fetching scholar stats:', error);
+    
+    document.querySelector('.container').innerHTML = `
+        <div class="error-message">
+            <h2>Error Loading Data</h2>
+            <p>Could not load scholar statistics. Please try again later.</p>
+            <p>Error details: ${error.message}</p>
+        </div>
+    `;
+}
+
+// Fetch the shard manifest, or null if the site isn't using sharded output
+async function fetchManifest() {
+    try {
+        // The manifest is the only mutable file, so always revalidate it
+        const response = await fetch(manifestUrl, { cache: 'no-cache' });
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        console.warn('Manifest unavailable, falling back to single profile stats:', error);
+        return null;
     }
 }
 
+// Fetch one profile's content-hashed shard and display it
+async function loadProfileShard(manifest, scholarId) {
+    const entry = manifest.profiles[scholarId];
+    const response = await fetch(new URL(entry.path, manifestUrl));
+    
+    if (!response.ok) {
+        throw new Error(`HTTP error! Status: ${response.status}`);
+    }
+    
+    // Shards are keyed by content only; the fetch time comes from the manifest
+    const payload = await response.json();
+    displayDashboardPayload({ ...payload, updated_at: entry.updated_at });
+}
+
+// Fill the profile selector from the manifest; hidden when there is a single profile
+function setupProfileSelector(manifest, selectedId) {
+    const entries = Object.entries(manifest.profiles);
+    if (!profileSelectElement || entries.length < 2) {
+        return;
+    }
+    
+    entries.sort(([, a], [, b]) => (a.name || '').localeCompare(b.name || ''));
+    profileSelectElement.innerHTML = '';
+    for (const [scholarId, entry] of entries) {
+        const option = document.createElement('option');
+        option.value = scholarId;
+        option.textContent = `${entry.name || scholarId} (${entry.citations ?? 'N/A'} citations)`;
+        option.selected = scholarId === selectedId;
+        profileSelectElement.appendChild(option);
+    }
+    
+    profileSelectElement.hidden = false;
+    profileSelectElement.addEventListener('change', () => {
+        const scholarId = profileSelectElement.value;
+        window.history.replaceState(null, '', `?user=${encodeURIComponent(scholarId)}`);
+        loadProfileShard(manifest, scholarId).catch(showLoadError);
+    });
+}
+
+// Fetch the precomputed dashboard payload, or null if it hasn't been generated
+async function fetchDashboardPayload() {
+    try {
+        const response = await fetch('data/scholar_stats.min.json');
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        console.warn('Dashboard payload unavailable, falling back to full stats:', error);
+        return null;
+    }
+}
+
+// Display the precomputed dashboard payload on the page
+function displayDashboardPayload(payload) {
+    scholarNameElement.textContent = payload.name || 'Scholar Statistics';
+    scholarInterestsElement.textContent = (payload.interests || []).join(', ');
+    
+    if (payload.citation_stats) {
+        displayCitationMetrics(payload.citation_stats);
+    }
+    
+    if (payload.updated_at) {
+        lastUpdatedElement.textContent = payload.updated_at;
+    }
+    
+    const windowStart = payload.windows?.[`since_${startYear}`];
+    if (windowStart === undefined) {
+        // Payload was built for a different start year, filter it here instead
+        createCitationChart(payload.years.map((year, i) => ({ year, citations: payload.citations[i] })));
+        return;
+    }
+    
+    renderCitationChart(payload.years.slice(windowStart), payload.citations.slice(windowStart));
+}
+
 // Display the scholar stats on the page
 function displayScholarStats(data) {
     // Display profile information
@@ -98,6 +209,7 @@ function displayCitationMetrics(citationStats) {
 // Create the citation history chart
 function createCitationChart(historyData) {
     if (!historyData || historyData.length === 0) {
+        showEmptyChartMessage();
         return;
     }
     
@@ -106,12 +218,7 @@ function createCitationChart(historyData) {
     
     // Check if we have any data after filtering
     if (filteredData.length === 0) {
-        console.warn(`No data available from year ${startYear} onwards`);
-        // Optionally display a message in the chart area
-        const chartContainer = citationChartElement.parentElement;
-        if (chartContainer) {
-            chartContainer.innerHTML = `<p style="text-align: center; padding: 20px;">No citation data available from ${startYear} onwards</p>`;
-        }
+        showEmptyChartMessage();
         return;
     }
     
@@ -122,10 +229,40 @@ function createCitationChart(historyData) {
     const labels = filteredData.map(item => item.year);
     const citationData = filteredData.map(item => item.citations);
     
+    renderCitationChart(labels, citationData);
+}
+
+// Show a message in place of the chart when there is nothing to plot
+function showEmptyChartMessage() {
+    console.warn(`No data available from year ${startYear} onwards`);
+    
+    // Keep the canvas in the page so the next profile can draw into it again
+    if (citationChart) {
+        citationChart.destroy();
+        citationChart = undefined;
+    }
+    citationChartElement.parentElement.hidden = true;
+    if (chartEmptyElement) {
+        chartEmptyElement.textContent = `No citation data available from ${startYear} onwards`;
+        chartEmptyElement.hidden = false;
+    }
+}
+
+// Render the citation bar chart from parallel label/count arrays
+function renderCitationChart(labels, citationData) {
+    if (labels.length === 0) {
+        showEmptyChartMessage();
+        return;
+    }
+    
     // Destroy previous chart if it exists
     if (citationChart) {
         citationChart.destroy();
     }
+    citationChartElement.parentElement.hidden = false;
+    if (chartEmptyElement) {
+        chartEmptyElement.hidden = true;
+    }
     
     // Create the chart
     citationChart = new Chart(citationChartElement, {
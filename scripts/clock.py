@@ -0,0 +1,71 @@
+"""Clock, sleep and randomness behind one injectable interface
+
+get_html_content() takes a clock instead of calling time.sleep and
+random.uniform directly. SystemClock is the real thing; VirtualClock advances
+instantly and records every sleep, so the retry cascade and batch schedules can
+be exercised in tests and simulations without real waiting.
+"""
+import random
+import threading
+import time
+
+class SystemClock:
+    """Wall-clock time, real sleeps and the global random generator"""
+    
+    def now(self):
+        """Monotonic time in seconds"""
+        return time.monotonic()
+    
+    def sleep(self, seconds):
+        """Block for the given number of seconds"""
+        time.sleep(seconds)
+    
+    def uniform(self, a, b):
+        """Random float in [a, b]"""
+        return random.uniform(a, b)
+
+class VirtualClock:
+    """Simulated clock whose sleeps return immediately and advance virtual time
+    
+    Every call to sleep() is recorded in `schedule` as a (start, seconds) tuple,
+    so callers can assert the exact timing a fetch or scheduler produced.
+    Randomness comes from a private generator that can be seeded for
+    reproducible runs. One clock may be shared by several threads (pipeline
+    fetch workers, the discovery rate limiter).
+    """
+    
+    def __init__(self, start=0.0, seed=None):
+        self.time = start
+        self.schedule = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def now(self):
+        """Current virtual time in seconds"""
+        with self._lock:
+            return self.time
+    
+    def sleep(self, seconds):
+        """Record the sleep and advance virtual time without waiting"""
+        seconds = max(0.0, seconds)
+        with self._lock:
+            self.schedule.append((self.time, seconds))
+            self.time += seconds
+    
+    def uniform(self, a, b):
+        """Random float in [a, b] from the clock's own generator"""
+        with self._lock:
+            return self._random.uniform(a, b)
+    
+    def advance(self, seconds):
+        """Move virtual time forward without recording a sleep, e.g. to model work"""
+        with self._lock:
+            self.time += max(0.0, seconds)
+    
+    @property
+    def total_slept(self):
+        """Sum of all recorded sleeps in seconds"""
+        with self._lock:
+            return sum(seconds for _, seconds in self.schedule)
+
+SYSTEM_CLOCK = SystemClock()
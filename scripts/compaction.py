@@ -0,0 +1,189 @@
+"""Retention and downsampling of the per-profile snapshot history
+
+Snapshots written by snapshot_diff.py to <history_dir>/<scholar_id>.jsonl are
+kept at full resolution for `recent_days`, then downsampled to the last
+snapshot of each ISO week (split at month ends), and after `monthly_after_days`
+to the last snapshot of each month. Change points - snapshots whose citation_stats or
+citation_history differ from the snapshot before them - are always kept.
+
+Cutoffs are aligned to week and month starts and remembered per profile in
+compaction_state.json, so each run only looks at snapshots that aged past a
+cutoff since the previous run, and skips profiles whose cutoffs haven't moved.
+
+Usage: python scripts/compaction.py [--history-dir data/history]
+"""
+import os
+import sys
+import json
+import logging
+import datetime
+import argparse
+
+from snapshot_diff import DEFAULT_HISTORY_DIR
+from stats_utils import TIMESTAMP_FORMAT, parse_updated_at
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECENT_DAYS = 30
+DEFAULT_MONTHLY_AFTER_DAYS = 365
+STATE_FILE = "compaction_state.json"
+
+def week_start(moment):
+    """Midnight on the Monday of moment's ISO week"""
+    day = moment.date() - datetime.timedelta(days=moment.weekday())
+    return datetime.datetime.combine(day, datetime.time())
+
+def month_start(moment):
+    """Midnight on the first day of moment's month"""
+    return datetime.datetime(moment.year, moment.month, 1)
+
+def cutoffs(now, recent_days=DEFAULT_RECENT_DAYS, monthly_after_days=DEFAULT_MONTHLY_AFTER_DAYS):
+    """Return (weekly_cutoff, monthly_cutoff): snapshots before these get downsampled"""
+    weekly = week_start(now - datetime.timedelta(days=recent_days))
+    monthly = month_start(now - datetime.timedelta(days=monthly_after_days))
+    return weekly, min(monthly, weekly)
+
+def snapshot_content(snapshot):
+    """The part of a snapshot whose changes make it a change point"""
+    metrics = snapshot.get('metrics', {})
+    return metrics.get('citation_stats'), metrics.get('citation_history')
+
+def compact_snapshots(snapshots, weekly_cutoff, monthly_cutoff, done_weekly=None, done_monthly=None):
+    """Downsample a time-ordered list of snapshots and return the ones to keep
+
+    Snapshots older than done_monthly / done_weekly were already compacted to
+    that resolution by an earlier run and are passed through untouched.
+    """
+    def tier(moment):
+        if moment is None:
+            return None
+        if moment < monthly_cutoff:
+            return None if done_monthly and moment < done_monthly else 'monthly'
+        if moment < weekly_cutoff:
+            return None if done_weekly and moment < done_weekly else 'weekly'
+        return None
+
+    def bucket(moment, resolution):
+        if resolution == 'monthly':
+            return (moment.year, moment.month)
+        # Weeks are split at month ends so the last snapshot of every month survives
+        # weekly compaction, and a later monthly pass keeps the same one a fresh pass would
+        return (*moment.isocalendar()[:2], moment.month)
+
+    moments = [parse_updated_at(snapshot) for snapshot in snapshots]
+    tiers = [tier(moment) for moment in moments]
+
+    # The last snapshot of every bucket that is being downsampled survives
+    last_in_bucket = {}
+    for index, (moment, resolution) in enumerate(zip(moments, tiers)):
+        if resolution:
+            last_in_bucket[(resolution, bucket(moment, resolution))] = index
+
+    kept = []
+    previous_content = None
+    for index, (snapshot, moment, resolution) in enumerate(zip(snapshots, moments, tiers)):
+        content = snapshot_content(snapshot)
+        is_change_point = index == 0 or content != previous_content
+        previous_content = content
+
+        if (resolution is None or is_change_point
+                or last_in_bucket[(resolution, bucket(moment, resolution))] == index):
+            kept.append(snapshot)
+
+    return kept
+
+def load_state(history_dir=DEFAULT_HISTORY_DIR):
+    """Load the per-profile cutoffs applied by previous runs"""
+    try:
+        with open(os.path.join(history_dir, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read compaction state, recompacting everything: %s", e)
+        return {}
+
+def save_state(state, history_dir=DEFAULT_HISTORY_DIR):
+    """Persist the per-profile cutoffs"""
+    with open(os.path.join(history_dir, STATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+def compact_profile(filename, weekly_cutoff, monthly_cutoff, previous_state=None):
+    """Compact one profile's snapshot file in place; returns (before, after) counts"""
+    previous_state = previous_state or {}
+    done_weekly = datetime.datetime.strptime(previous_state['weekly_until'], TIMESTAMP_FORMAT) \
+        if previous_state.get('weekly_until') else None
+    done_monthly = datetime.datetime.strptime(previous_state['monthly_until'], TIMESTAMP_FORMAT) \
+        if previous_state.get('monthly_until') else None
+
+    with open(filename, 'r', encoding='utf-8') as f:
+        snapshots = [json.loads(line) for line in f if line.strip()]
+
+    kept = compact_snapshots(snapshots, weekly_cutoff, monthly_cutoff, done_weekly, done_monthly)
+
+    if len(kept) < len(snapshots):
+        temp_filename = filename + '.tmp'
+        with open(temp_filename, 'w', encoding='utf-8') as f:
+            for snapshot in kept:
+                f.write(json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')) + '\n')
+        os.replace(temp_filename, filename)
+
+    return len(snapshots), len(kept)
+
+def compact_history(history_dir=DEFAULT_HISTORY_DIR, now=None, recent_days=DEFAULT_RECENT_DAYS,
+                    monthly_after_days=DEFAULT_MONTHLY_AFTER_DAYS):
+    """Compact every profile in history_dir whose cutoffs moved since the last run"""
+    now = now or datetime.datetime.now()
+    weekly_cutoff, monthly_cutoff = cutoffs(now, recent_days, monthly_after_days)
+    new_state = {
+        'weekly_until': weekly_cutoff.strftime(TIMESTAMP_FORMAT),
+        'monthly_until': monthly_cutoff.strftime(TIMESTAMP_FORMAT)
+    }
+    state = load_state(history_dir)
+    totals = {'profiles': 0, 'skipped': 0, 'before': 0, 'after': 0}
+
+    if not os.path.isdir(history_dir):
+        logger.info("No snapshot history in %s", history_dir)
+        return totals
+
+    for name in sorted(os.listdir(history_dir)):
+        if not name.endswith('.jsonl'):
+            continue
+        scholar_id = name[:-len('.jsonl')]
+
+        if state.get(scholar_id) == new_state:
+            totals['skipped'] += 1
+            continue
+
+        before, after = compact_profile(os.path.join(history_dir, name), weekly_cutoff,
+                                        monthly_cutoff, state.get(scholar_id))
+        state[scholar_id] = dict(new_state)
+        totals['profiles'] += 1
+        totals['before'] += before
+        totals['after'] += after
+        if after < before:
+            logger.info("Compacted %s: %s -> %s snapshots", scholar_id, before, after)
+
+    save_state(state, history_dir)
+    return totals
+
+def main(argv=None):
+    """Compact the snapshot history"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Downsample old snapshots in the history")
+    parser.add_argument('--history-dir', default=DEFAULT_HISTORY_DIR,
+                        help="Directory of per-profile snapshots (default: %(default)s)")
+    parser.add_argument('--recent-days', type=int, default=DEFAULT_RECENT_DAYS,
+                        help="Keep every snapshot this recent (default: %(default)s)")
+    parser.add_argument('--monthly-after-days', type=int, default=DEFAULT_MONTHLY_AFTER_DAYS,
+                        help="Keep one snapshot per month beyond this age (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    totals = compact_history(args.history_dir, recent_days=args.recent_days,
+                             monthly_after_days=args.monthly_after_days)
+    print(f"Compacted {totals['profiles']} profiles ({totals['skipped']} unchanged cutoffs skipped): "
+          f"{totals['before']} -> {totals['after']} snapshots")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
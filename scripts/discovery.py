@@ -0,0 +1,224 @@
+"""Discover scholar IDs from Google Scholar organisation and author listings
+
+Walks `view_op=view_org` pages for organisation IDs and `view_op=search_authors`
+pages for search queries (e.g. 'label:digital_transformation'), following the
+after_author pagination token of each page's Next button. Listings are walked
+concurrently, but every request waits for a shared rate limiter, so adding
+listings never raises the request rate.
+
+The result is written as a roster in --ids-file format. New members are also
+written to a separate file, so only they need a full first fetch. IDs are only
+dropped from the roster when every listing was walked to its last page; a
+listing cut short by an error can't tell who left.
+
+    python scripts/discovery.py --org 1234567890 --roster data/roster.txt
+    python scripts/get_scholar_stats.py --sharded --ids-file data/roster_new.txt
+"""
+import os
+import re
+import sys
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urljoin, urlparse
+
+from clock import SYSTEM_CLOCK
+
+logger = logging.getLogger(__name__)
+
+SCHOLAR_BASE = "https://scholar.google.com"
+DEFAULT_ROSTER = "data/roster.txt"
+DEFAULT_NEW_IDS = "data/roster_new.txt"
+DEFAULT_MIN_INTERVAL = 5.0
+DEFAULT_MAX_PAGES = 50
+
+LISTING_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Referer': 'https://scholar.google.com/',
+}
+
+class RateLimiter:
+    """Spaces requests from any number of threads at least min_interval apart"""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, clock=None):
+        self.min_interval = min_interval
+        self.clock = clock or SYSTEM_CLOCK
+        self._lock = threading.Lock()
+        self._next_slot = None
+
+    def wait(self):
+        """Block until this caller's request slot comes up"""
+        with self._lock:
+            now = self.clock.now()
+            slot = now if self._next_slot is None else max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            self.clock.sleep(slot - now)
+
+def org_url(org_id):
+    """First page of an organisation's author listing"""
+    return f"{SCHOLAR_BASE}/citations?" + urlencode({'view_op': 'view_org', 'org': org_id, 'hl': 'en'})
+
+def search_url(query):
+    """First page of an author search, e.g. 'label:machine_learning'"""
+    return f"{SCHOLAR_BASE}/citations?" + urlencode({'view_op': 'search_authors', 'mauthors': query, 'hl': 'en'})
+
+def parse_listing(html, page_url):
+    """Return ([(scholar_id, name), ...], next_page_url or None) for one listing page"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    authors = []
+    for entry in soup.select('div.gsc_1usr'):
+        link = entry.select_one('h3.gs_ai_name a') or entry.select_one('a[href*="user="]')
+        if not link:
+            continue
+        user = parse_qs(urlparse(link.get('href', '')).query).get('user')
+        if user:
+            authors.append((user[0], link.text.strip()))
+
+    # The Next button carries the pagination token in an escaped onclick URL
+    next_url = None
+    next_button = soup.select_one('button.gs_btnPR')
+    if next_button and not next_button.has_attr('disabled'):
+        match = re.search(r"window\.location='([^']+)'", next_button.get('onclick', ''))
+        if match:
+            target = match.group(1).encode('utf-8').decode('unicode_escape')
+            next_url = urljoin(page_url, target)
+
+    return authors, next_url
+
+def walk_listing(start_url, limiter, transport=None, max_pages=DEFAULT_MAX_PAGES):
+    """Follow one listing's pagination; returns ((scholar_id, name) pairs, complete)
+
+    complete is False when the walk stopped early on an error or max_pages.
+    """
+    from transport import TransportError, get_default_transport
+
+    transport = transport or get_default_transport()
+    authors = []
+    url = start_url
+
+    for page in range(1, max_pages + 1):
+        limiter.wait()
+        try:
+            response = transport.get(url, headers=LISTING_HEADERS, timeout=30)
+            response.raise_for_status()
+        except TransportError as e:
+            logger.error("Stopping listing %s at page %s: %s", start_url, page, e)
+            return authors, False
+
+        page_authors, url = parse_listing(response.text, url)
+        authors.extend(page_authors)
+        logger.info("Page %s of %s: %s authors", page, start_url, len(page_authors))
+        if not url:
+            return authors, True
+
+    logger.warning("Stopped %s after %s pages", start_url, max_pages)
+    return authors, False
+
+def discover(start_urls, workers=2, min_interval=DEFAULT_MIN_INTERVAL, clock=None, transport=None,
+             max_pages=DEFAULT_MAX_PAGES):
+    """Walk several listings concurrently under one rate limit
+
+    Returns ({scholar_id: name}, incomplete) where incomplete lists the start
+    URLs of listings that were not walked to the end.
+    """
+    limiter = RateLimiter(min_interval, clock)
+    roster = {}
+    incomplete = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(walk_listing, url, limiter, transport, max_pages) for url in start_urls]
+        for url, future in zip(start_urls, futures):
+            authors, complete = future.result()
+            if not complete:
+                incomplete.append(url)
+            for scholar_id, name in authors:
+                roster.setdefault(scholar_id, name)
+
+    return roster, incomplete
+
+def load_roster(filename=DEFAULT_ROSTER):
+    """Read a roster written by save_roster(); returns {scholar_id: name}"""
+    roster = {}
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                scholar_id, _, comment = line.partition('#')
+                if scholar_id.strip():
+                    roster[scholar_id.strip()] = comment.strip()
+    except FileNotFoundError:
+        pass
+    return roster
+
+def save_roster(roster, filename=DEFAULT_ROSTER):
+    """Write {scholar_id: name} in --ids-file format, with names as comments"""
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        for scholar_id, name in sorted(roster.items(), key=lambda item: (item[1].lower(), item[0])):
+            f.write(f"{scholar_id}  # {name}\n" if name else f"{scholar_id}\n")
+
+def diff_rosters(previous, current):
+    """Return (added, removed) scholar IDs between two rosters"""
+    added = sorted(set(current) - set(previous))
+    removed = sorted(set(previous) - set(current))
+    return added, removed
+
+def main(argv=None):
+    """Discover profiles and update the roster"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Discover scholar IDs from organisation and author listings")
+    parser.add_argument('--org', action='append', default=[],
+                        help="Organisation ID from a Scholar 'org=' URL (repeatable)")
+    parser.add_argument('--search', action='append', default=[],
+                        help="Author search query such as 'label:digital_transformation' (repeatable)")
+    parser.add_argument('--roster', default=DEFAULT_ROSTER,
+                        help="Roster file to update (default: %(default)s)")
+    parser.add_argument('--new-ids', default=DEFAULT_NEW_IDS,
+                        help="File receiving only the newly discovered IDs (default: %(default)s)")
+    parser.add_argument('--keep-removed', action='store_true',
+                        help="Keep IDs that no longer appear in any listing")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Listings walked concurrently (default: %(default)s)")
+    parser.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL,
+                        help="Minimum seconds between any two requests (default: %(default)s)")
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES,
+                        help="Maximum pages per listing (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    start_urls = [org_url(org) for org in args.org] + [search_url(query) for query in args.search]
+    if not start_urls:
+        parser.error("give at least one --org or --search")
+
+    previous = load_roster(args.roster)
+    discovered, incomplete = discover(start_urls, args.workers, args.min_interval, max_pages=args.max_pages)
+    if not discovered:
+        logger.error("No profiles discovered, leaving the roster unchanged")
+        return 1
+
+    added, removed = diff_rosters(previous, discovered)
+    # The roster doesn't record which listing an ID came from, so any partial walk keeps everyone
+    keep_removed = args.keep_removed or bool(incomplete)
+    if incomplete and not args.keep_removed:
+        logger.warning("%s listing(s) not walked completely, keeping %s unlisted IDs", len(incomplete), len(removed))
+        removed = []
+    roster = {**previous, **discovered} if keep_removed else discovered
+
+    save_roster(roster, args.roster)
+    save_roster({scholar_id: discovered[scholar_id] for scholar_id in added}, args.new_ids)
+
+    print(f"\n--- Roster Discovery Summary ---")
+    print(f"Discovered: {len(discovered)}")
+    print(f"New: {len(added)} (written to {args.new_ids})")
+    print(f"No longer listed: {len(removed)}" + (" (kept)" if args.keep_removed else ""))
+    if incomplete:
+        print(f"Incomplete listings: {len(incomplete)}")
+    print(f"Roster: {len(roster)} IDs in {args.roster}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
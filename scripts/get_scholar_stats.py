@@ -1,15 +1,24 @@
 import os
-import requests
-from bs4 import BeautifulSoup
+import sys
 import json
 import datetime
 import re
-from dotenv import load_dotenv
 import logging
-import urllib3
+import argparse
+import gzip
+import hashlib
 
-# Disable SSL warnings (use with caution in production)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from batch_logging import DEFAULT_BURST, DEFAULT_INTERVAL, LOG_FORMATS, configure_logging, profile_context
+from clock import SYSTEM_CLOCK
+from group_rollups import DEFAULT_GROUPS, DEFAULT_ROLLUPS
+from stats_utils import headline_metrics, parse_updated_at
+from negative_cache import DEFAULT_NEGATIVE_CACHE
+from search_index import DEFAULT_SEARCH_INDEX, load_index, save_index, update_profile
+from snapshot_diff import (DEFAULT_CHANGE_LOG, DEFAULT_CONFIRM_RUNS, DEFAULT_HISTORY_DIR, DEFAULT_Z_THRESHOLD,
+                           review_snapshot)
+
+# requests, bs4, urllib3, dotenv and the transport backends are imported lazily on the code paths that
+# need them, so config errors, cache hits and --preflight runs start quickly.
 
 # Set up logging
 logging.basicConfig(
@@ -18,13 +27,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def load_environment_variables():
+DEFAULT_OUTPUT = "data/scholar_stats.json"
+DEFAULT_SHARD_DIR = "data/profiles"
+DEFAULT_MANIFEST = "data/manifest.json"
+PROFILE_URL = "https://scholar.google.com/citations?user={scholar_id}&hl=en"
+
+# Realistic browser headers used by the direct connection strategy. Accept-Encoding
+# is filled in by the transport with the encodings it can actually decode.
+DIRECT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Cache-Control': 'no-cache',
+    'Pragma': 'no-cache',
+    'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    'Sec-Ch-Ua-Mobile': '?0',
+    'Sec-Ch-Ua-Platform': '"Windows"',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Upgrade-Insecure-Requests': '1',
+    'Connection': 'keep-alive'
+}
+
+# Start year of the chart in js/chart.js; precomputed as a dashboard window
+DASHBOARD_START_YEAR = 2020
+
+# Markers of Google's bot-detection interstitial in a profile response
+BLOCK_MARKERS = ('gs_captcha', 'unusual traffic', '/sorry/')
+
+def load_scholar_ids(ids_file=None):
+    """Return the scholar IDs to process from --ids-file, SCHOLAR_IDS or SCHOLAR_ID"""
+    if ids_file:
+        with open(ids_file, 'r', encoding='utf-8') as f:
+            lines = [line.split('#', 1)[0].strip() for line in f]
+        scholar_ids = [line for line in lines if line]
+        if not scholar_ids:
+            raise EnvironmentError(f"No scholar IDs found in {ids_file}")
+        return scholar_ids
+    
+    load_environment_variables(required_vars=[])
+    if os.getenv('SCHOLAR_IDS'):
+        return re.findall(r'[^\s,]+', os.getenv('SCHOLAR_IDS'))
+    
+    return [load_environment_variables()['SCHOLAR_ID']]
+
+def load_environment_variables(required_vars=('SCHOLAR_ID',)):
     """Load environment variables from .env file or environment"""
-    load_dotenv()
+    # .env support is optional at runtime; real environment variables still work
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        logger.debug("python-dotenv not installed, reading environment only")
     
     # Only Scholar ID required for direct connection approach
-    required_vars = ['SCHOLAR_ID']
-    
     # Check if all required variables are set
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     
@@ -33,109 +91,110 @@ def load_environment_variables():
         
     return {var: os.getenv(var) for var in required_vars}
 
-def get_html_content(url):
-    """Fetch HTML content with enhanced anti-detection strategies"""
+def get_html_content(url, clock=None, transport=None, statuses=None):
+    """Fetch HTML content with enhanced anti-detection strategies
+    
+    All delays go through `clock` (SYSTEM_CLOCK by default), so a VirtualClock
+    can replay the strategy cascade without real waiting. Requests go through
+    `transport` (see transport.py), the shared default backend if not given.
+    If a `statuses` list is passed, the HTTP status of every attempt is
+    appended to it. A 404 ends the cascade, since no strategy can fix it.
+    """
+    from transport import TransportHTTPError, get_default_transport
+    
+    clock = clock or SYSTEM_CLOCK
+    transport = transport or get_default_transport()
     
     # Strategy 1: Enhanced direct connection with better headers
     try:
         logger.info("Attempting enhanced direct connection")
         
         # More realistic browser headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache',
-            'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-            'Sec-Ch-Ua-Mobile': '?0',
-            'Sec-Ch-Ua-Platform': '"Windows"',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Upgrade-Insecure-Requests': '1',
-            'Connection': 'keep-alive'
-        }
+        headers = DIRECT_HEADERS
         
-        import time
-        time.sleep(2)  # Initial delay
+        clock.sleep(2)  # Initial delay
         
-        response = requests.get(url, headers=headers, timeout=30, verify=False)
+        response = transport.get(url, headers=headers, timeout=30)
+        if statuses is not None:
+            statuses.append(response.status_code)
+        
+        if response.status_code == 404:
+            logger.error("❌ 404 Not Found - the profile does not exist, skipping other strategies")
+            return None
         
         if response.status_code == 403:
-            logger.warning(f"403 Forbidden error - Google Scholar is blocking the request")
+            logger.warning("403 Forbidden error - Google Scholar is blocking the request")
             logger.info("This usually means: rate limiting, bot detection, or geographic restrictions")
         
         response.raise_for_status()
         logger.info("✅ Enhanced direct connection successful!")
         return response.text
         
-    except requests.exceptions.HTTPError as e:
+    except TransportHTTPError as e:
         if e.response.status_code == 403:
             logger.error("❌ 403 Forbidden - Google Scholar blocked the request")
             logger.info("Possible causes: rate limiting, bot detection, or IP restrictions")
         else:
-            logger.warning(f"HTTP error {e.response.status_code}: {e}")
+            logger.warning("HTTP error %s: %s", e.response.status_code, e)
     except Exception as e:
-        logger.warning(f"Enhanced direct connection failed: {e}")
+        logger.warning("Enhanced direct connection failed: %s", e)
     
     # Strategy 2: Try with longer delays and different approach
+    session = None
     try:
         logger.info("Trying with longer delays and session approach...")
         
-        session = requests.Session()
-        
         # Set more realistic headers
-        session.headers.update({
+        session = transport.session({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
             'DNT': '1',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
-        session.verify = False
         
         # First, visit the main Scholar page to establish session
         logger.info("Establishing session with Google Scholar...")
         session.get('https://scholar.google.com/', timeout=30)
         
         # Wait longer between requests
-        import time
-        import random
-        wait_time = random.uniform(5, 10)
-        logger.info(f"Waiting {wait_time:.1f} seconds before main request...")
-        time.sleep(wait_time)
+        wait_time = clock.uniform(5, 10)
+        logger.info("Waiting %.1f seconds before main request...", wait_time)
+        clock.sleep(wait_time)
         
         # Now try the actual request
         response = session.get(url, timeout=30)
+        if statuses is not None:
+            statuses.append(response.status_code)
+        
+        if response.status_code == 404:
+            logger.error("❌ 404 Not Found - the profile does not exist, skipping other strategies")
+            return None
         
         if response.status_code == 403:
             logger.error("❌ Still getting 403 with session approach")
-            session.close()
             return None
         
         response.raise_for_status()
-        session.close()
         logger.info("✅ Session approach successful!")
         return response.text
         
-    except requests.exceptions.HTTPError as e:
+    except TransportHTTPError as e:
         if e.response.status_code == 403:
             logger.error("❌ 403 Forbidden persists with session approach")
-        logger.warning(f"Session approach failed: {e}")
+        logger.warning("Session approach failed: %s", e)
     except Exception as e:
-        logger.warning(f"Session approach failed: {e}")
+        logger.warning("Session approach failed: %s", e)
+    finally:
+        if session:
+            session.close()
     
     # Strategy 3: Try academic/research user agent
     try:
         logger.info("Trying with academic user agent...")
         
-        import time
-        time.sleep(random.uniform(10, 15))  # Longer delay
+        clock.sleep(clock.uniform(10, 15))  # Longer delay
         
         academic_headers = {
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -145,12 +204,14 @@ def get_html_content(url):
             'Cache-Control': 'max-age=0',
         }
         
-        response = requests.get(url, headers=academic_headers, timeout=30, verify=False)
+        response = transport.get(url, headers=academic_headers, timeout=30)
+        if statuses is not None:
+            statuses.append(response.status_code)
         response.raise_for_status()
         logger.info("✅ Academic user agent successful!")
         return response.text
         
-    except requests.exceptions.HTTPError as e:
+    except TransportHTTPError as e:
         if e.response.status_code == 403:
             logger.error("❌ 403 Forbidden - All strategies failed")
             logger.error("Recommendations:")
@@ -158,25 +219,103 @@ def get_html_content(url):
             logger.error("2. Check if your GitHub Actions IP is blocked")
             logger.error("3. Consider using the script from different environments")
             logger.error("4. Wait a few hours/days before trying again")
-        logger.warning(f"Academic approach failed: {e}")
+        logger.warning("Academic approach failed: %s", e)
     except Exception as e:
-        logger.warning(f"Academic approach failed: {e}")
+        logger.warning("Academic approach failed: %s", e)
     
     logger.error("❌ All connection strategies failed with 403 errors")
     logger.info("💡 Try running this script less frequently or from a different IP")
     return None
 
-def get_scholar_stats(scholar_id):
+def get_scholar_stats(scholar_id, clock=None, stream=False, archive_dir=None, statuses=None):
     """Get statistics for a Google Scholar profile"""
-    url = f"https://scholar.google.com/citations?user={scholar_id}&hl=en"
-    html = get_html_content(url)
+    html = fetch_profile_html(scholar_id, clock, stream, archive_dir=archive_dir, statuses=statuses)
     
     if not html:
-        logger.error(f"Failed to get data for Scholar ID: {scholar_id}")
+        logger.error("Failed to get data for Scholar ID: %s", scholar_id)
         return None
     
+    return parse_scholar_html(html, scholar_id)
+
+def stream_profile_html(url, clock=None, chunk_size=16384, transport=None, statuses=None):
+    """Fetch only the headline part of a profile page, closing the connection early
+    
+    The body is read incrementally and fed to streaming.ProfileHeadCapture;
+    reading stops once the profile header, the gsc_rsb_st table and the
+    histogram are complete. Returns (html, truncated): truncated is True when
+    reading stopped before the end of the page. html is None if the request
+    failed so the caller can fall back to get_html_content(). The response
+    status is appended to `statuses` like get_html_content() does.
+    """
+    from streaming import read_profile_head
+    from transport import TransportHTTPError, get_default_transport
+    
+    clock = clock or SYSTEM_CLOCK
+    transport = transport or get_default_transport()
+    
+    try:
+        logger.info("Attempting streaming connection")
+        clock.sleep(2)  # Initial delay
+        
+        with transport.stream(url, headers=DIRECT_HEADERS, timeout=30, chunk_size=chunk_size) as response:
+            if statuses is not None:
+                statuses.append(response.status_code)
+            response.raise_for_status()
+            html, complete, truncated = read_profile_head(response.chunks, response.encoding or 'utf-8')
+    except TransportHTTPError as e:
+        logger.warning("Streaming connection failed with HTTP %s", e.response.status_code)
+        return None, False
+    except Exception as e:
+        logger.warning("Streaming connection failed: %s", e)
+        return None, False
+    
+    if truncated:
+        logger.info("✅ Captured headline sections after %s characters, connection closed early", len(html))
+    elif complete:
+        logger.info("Captured headline sections at the end of the page (%s characters)", len(html))
+    else:
+        logger.info("Headline sections not all found, read full page (%s characters)", len(html))
+    return html, truncated
+
+def fetch_profile_html(scholar_id, clock=None, stream=False, transport=None, archive_dir=None,
+                       statuses=None):
+    """Fetch the HTML of a Google Scholar profile page
+    
+    With stream=True only the headline part of the page is read, falling back
+    to the full strategy cascade if the streaming request fails. If archive_dir
+    is set, the page is also stored in the deduplicating raw HTML archive;
+    streamed prefixes are indexed as partial so they are never replayed as
+    full pages.
+    """
+    url = PROFILE_URL.format(scholar_id=scholar_id)
+    statuses = statuses if statuses is not None else []
+    html, partial = stream_profile_html(url, clock, transport=transport, statuses=statuses) if stream else (None, False)
+    if not html and 404 in statuses:
+        logger.error("❌ 404 Not Found - the profile does not exist, skipping other strategies")
+        return None
+    if not html:
+        html = get_html_content(url, clock, transport, statuses)
+    
+    if html and archive_dir:
+        from html_archive import archive_page
+        try:
+            archive_page(scholar_id, html, archive_dir, partial=partial)
+        except OSError as e:
+            logger.warning("Could not archive page for %s: %s", scholar_id, e)
+    
+    return html
+
+def parse_scholar_html(html, scholar_id):
+    """Parse the statistics out of a Google Scholar profile page
+    
+    Kept free of network and file access so it can run in a worker process.
+    """
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, "html.parser")
     
+    # Per-element problems are counted and reported once in the profile summary
+    element_errors = 0
+    
     try:
         # Extract profile information
         profile_data = {}
@@ -185,7 +324,7 @@ def get_scholar_stats(scholar_id):
         name_elem = soup.select_one('#gsc_prf_in')
         if name_elem:
             profile_data['name'] = name_elem.text.strip()
-            logger.info(f"Found scholar name: {profile_data['name']}")
+            logger.debug("Found scholar name: %s", profile_data['name'])
         else:
             logger.warning("Could not find scholar name")
         
@@ -193,7 +332,7 @@ def get_scholar_stats(scholar_id):
         affiliation_elem = soup.select_one('.gsc_prf_il')
         if affiliation_elem:
             profile_data['affiliation'] = affiliation_elem.text.strip()
-            logger.info(f"Found affiliation: {profile_data['affiliation']}")
+            logger.debug("Found affiliation: %s", profile_data['affiliation'])
         else:
             logger.warning("Could not find affiliation")
         
@@ -203,7 +342,7 @@ def get_scholar_stats(scholar_id):
         for elem in interest_elems:
             interests.append(elem.text.strip())
         profile_data['interests'] = interests
-        logger.info(f"Found {len(interests)} research interests")
+        logger.debug("Found %s research interests", len(interests))
         
         # Citation metrics with specific selectors for the HTML structure
         metrics = {}
@@ -214,38 +353,38 @@ def get_scholar_stats(scholar_id):
         # Debug the table structure
         citation_table = soup.select_one('table#gsc_rsb_st')
         if citation_table:
-            logger.info("Found citation table")
+            logger.debug("Found citation table")
         else:
             logger.warning("Could not find citation table with id='gsc_rsb_st'")
             # Try to find any tables
             all_tables = soup.select('table')
-            logger.info(f"Found {len(all_tables)} tables on the page")
+            logger.debug("Found %s tables on the page", len(all_tables))
         
         # Direct approach to extract the "since year" from table headers
         since_year = "recent"
         table_headers = soup.select('table#gsc_rsb_st thead tr th')
-        logger.info(f"Found {len(table_headers)} table header cells")
+        logger.debug("Found %s table header cells", len(table_headers))
         
         for i, header in enumerate(table_headers):
             header_classes = header.get('class', [])
             header_text = header.text.strip()
-            logger.info(f"Header {i+1}: class='{header_classes}', text='{header_text}'")
+            logger.debug("Header %s: class='%s', text='%s'", i+1, header_classes, header_text)
             
             # Look for the "Since YYYY" text in any header
             if "Since" in header_text:
                 year_match = re.search(r'(\d{4})', header_text)
                 if year_match:
                     since_year = year_match.group(1)
-                    logger.info(f"Extracted 'since year' from header {i+1}: {since_year}")
+                    logger.debug("Extracted 'since year' from header %s: %s", i+1, since_year)
         
         # If direct approach fails, try looking at the third header specifically
         if since_year == "recent" and len(table_headers) >= 3:
             since_text = table_headers[2].text.strip()
-            logger.info(f"Third header text: '{since_text}'")
+            logger.debug("Third header text: '%s'", since_text)
             year_match = re.search(r'(\d{4})', since_text)
             if year_match:
                 since_year = year_match.group(1)
-                logger.info(f"Extracted 'since year' from third header: {since_year}")
+                logger.debug("Extracted 'since year' from third header: %s", since_year)
         
         # Extract Citations (first row)
         citation_cells = soup.select('tr td.gsc_rsb_std')
@@ -253,9 +392,9 @@ def get_scholar_stats(scholar_id):
             all_citations = citation_cells[0].text.strip()
             recent_citations = citation_cells[1].text.strip()
             citation_stats["Citations"] = {'all': all_citations, f'since_{since_year}': recent_citations}
-            logger.info(f"Extracted citations: all={all_citations}, since_{since_year}={recent_citations}")
+            logger.debug("Extracted citations: all=%s, since_%s=%s", all_citations, since_year, recent_citations)
         else:
-            logger.warning(f"Could not find citation cells, found {len(citation_cells)} cells")
+            logger.warning("Could not find citation cells, found %s cells", len(citation_cells))
         
         # Extract h-index (second row)
         h_index_cells = soup.select('tr:nth-of-type(2) td.gsc_rsb_std')
@@ -263,7 +402,7 @@ def get_scholar_stats(scholar_id):
             all_h_index = h_index_cells[0].text.strip()
             recent_h_index = h_index_cells[1].text.strip()
             citation_stats["h-index"] = {'all': all_h_index, f'since_{since_year}': recent_h_index}
-            logger.info(f"Extracted h-index: all={all_h_index}, since_{since_year}={recent_h_index}")
+            logger.debug("Extracted h-index: all=%s, since_%s=%s", all_h_index, since_year, recent_h_index)
         
         # Extract i10-index (third row)
         i10_index_cells = soup.select('tr:nth-of-type(3) td.gsc_rsb_std')
@@ -271,29 +410,30 @@ def get_scholar_stats(scholar_id):
             all_i10_index = i10_index_cells[0].text.strip()
             recent_i10_index = i10_index_cells[1].text.strip()
             citation_stats["i10-index"] = {'all': all_i10_index, f'since_{since_year}': recent_i10_index}
-            logger.info(f"Extracted i10-index: all={all_i10_index}, since_{since_year}={recent_i10_index}")
+            logger.debug("Extracted i10-index: all=%s, since_%s=%s", all_i10_index, since_year, recent_i10_index)
         
         # Store all metrics in citation_stats (not using indices anymore)
         metrics['citation_stats'] = citation_stats
         
         # Citation history parsing specific to the HTML structure
         graph_data = []
+        history_fallback = False
         
         try:
-            logger.info("Parsing citation history")
+            logger.debug("Parsing citation history")
             
             # Find all year spans (they have class="gsc_g_t" and contain the year)
             year_spans = soup.select('span.gsc_g_t')
-            logger.info(f"Found {len(year_spans)} year spans")
+            logger.debug("Found %s year spans", len(year_spans))
             
             # Find all citation count spans (they have class="gsc_g_al" and contain the count)
             citation_spans = soup.select('span.gsc_g_al')
-            logger.info(f"Found {len(citation_spans)} citation count spans")
+            logger.debug("Found %s citation count spans", len(citation_spans))
             
             # If that doesn't work, try alternative format
             if not citation_spans:
                 citation_spans = soup.select('a.gsc_g_a span')
-                logger.info(f"Found {len(citation_spans)} citation count spans using alternative selector")
+                logger.debug("Found %s citation count spans using alternative selector", len(citation_spans))
             
             # Extract years and their values
             years = []
@@ -302,9 +442,10 @@ def get_scholar_stats(scholar_id):
                     year = span.text.strip()
                     years.append(year)
                 except Exception as e:
-                    logger.error(f"Error extracting year from span: {e}")
+                    element_errors += 1
+                    logger.debug("Error extracting year from span: %s", e)
             
-            logger.info(f"Extracted years: {years}")
+            logger.debug("Extracted years: %s", years)
             
             # Extract citation counts
             citations = []
@@ -315,13 +456,14 @@ def get_scholar_stats(scholar_id):
                 except ValueError:
                     citations.append(0)
                 except Exception as e:
-                    logger.error(f"Error extracting citation count from span: {e}")
+                    element_errors += 1
+                    logger.debug("Error extracting citation count from span: %s", e)
             
-            logger.info(f"Extracted citation counts: {citations}")
+            logger.debug("Extracted citation counts: %s", citations)
             
             # If we couldn't find citation counts using spans, try to extract from the elements
             if not citations and year_spans:
-                logger.info("Attempting to extract citation counts from elements")
+                logger.debug("Attempting to extract citation counts from elements")
                 citation_elements = soup.select('a.gsc_g_a')
                 
                 for elem in citation_elements:
@@ -335,9 +477,10 @@ def get_scholar_stats(scholar_id):
                             except ValueError:
                                 citations.append(0)
                     except Exception as e:
-                        logger.error(f"Error extracting from citation element: {e}")
+                        element_errors += 1
+                        logger.debug("Error extracting from citation element: %s", e)
                 
-                logger.info(f"Extracted {len(citations)} citation counts from elements")
+                logger.debug("Extracted %s citation counts from elements", len(citations))
             
             # Create year-citation pairs
             # If years and citations have different lengths, use the smaller length
@@ -349,11 +492,11 @@ def get_scholar_stats(scholar_id):
                         'citations': citations[i]
                     })
                 
-                logger.info(f"Created {len(graph_data)} year-citation pairs")
+                logger.debug("Created %s year-citation pairs", len(graph_data))
             
             # Last resort: Parse from the style attributes
             if not graph_data:
-                logger.info("Attempting to extract citation data from style attributes")
+                logger.debug("Attempting to extract citation data from style attributes")
                 
                 # Extract years and positions from the spans
                 year_data = []
@@ -366,7 +509,8 @@ def get_scholar_stats(scholar_id):
                             position = int(position_match.group(1))
                             year_data.append({'year': year, 'position': position})
                     except Exception as e:
-                        logger.error(f"Error extracting position for year {year}: {e}")
+                        element_errors += 1
+                        logger.debug("Error extracting position for year %s: %s", year, e)
                 
                 # Extract citation counts and positions
                 citation_data = []
@@ -382,7 +526,8 @@ def get_scholar_stats(scholar_id):
                             count = int(count_span.text.strip())
                             citation_data.append({'position': position, 'count': count})
                     except Exception as e:
-                        logger.error(f"Error extracting citation data from element: {e}")
+                        element_errors += 1
+                        logger.debug("Error extracting citation data from element: %s", e)
                 
                 # Match years and citations by their positions
                 if year_data and citation_data:
@@ -402,18 +547,19 @@ def get_scholar_stats(scholar_id):
                             'citations': citation
                         })
                     
-                    logger.info(f"Created {len(graph_data)} year-citation pairs from positions")
+                    logger.debug("Created %s year-citation pairs from positions", len(graph_data))
             
         except Exception as e:
-            logger.error(f"Error parsing citation history: {e}")
+            logger.error("Error parsing citation history: %s", e)
         
         # Sort by year if we have data
         if graph_data:
             graph_data.sort(key=lambda x: x['year'])
-            logger.info(f"Sorted {len(graph_data)} data points by year")
+            logger.debug("Sorted %s data points by year", len(graph_data))
         else:
             # Create fallback data if we couldn't parse anything
             logger.warning("No citation history data found, creating fallback data")
+            history_fallback = True
             current_year = datetime.datetime.now().year
             years_back = 10
             
@@ -446,7 +592,7 @@ def get_scholar_stats(scholar_id):
                         'citations': 10 * (i + 1)  # Simple increasing trend
                     })
             
-            logger.info(f"Created {len(graph_data)} fallback data points")
+            logger.debug("Created %s fallback data points", len(graph_data))
         
         metrics['citation_history'] = graph_data
         
@@ -454,15 +600,34 @@ def get_scholar_stats(scholar_id):
         scholar_stats = {
             'profile': profile_data,
             'metrics': metrics,
+            'scholar_id': scholar_id,
             'updated_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'source': 'direct_connection',
             'source': 'direct_connection'  # Updated source
         }
         
+        # Flag synthetic data so later stages don't mistake it for a real scrape
+        if history_fallback:
+            scholar_stats['fallback'] = 'citation_history'
+        
+        summary = {
+            'name_found': 'name' in profile_data,
+            'interests': len(interests),
+            'citation_stats': sorted(citation_stats),
+            'since_year': since_year,
+            'history_points': len(graph_data),
+            'history_fallback': history_fallback,
+            'element_errors': element_errors,
+            'html_chars': len(html)
+        }
+        logger.info("Parsed profile %s: %s stats, %s history points%s", scholar_id, len(citation_stats),
+                    len(graph_data), " (fallback)" if history_fallback else "",
+                    extra={'scholar_id': scholar_id, 'event': 'profile_parsed', 'summary': summary})
+        
         return scholar_stats
     
     except Exception as e:
-        logger.error(f"Error parsing Google Scholar profile: {e}")
+        logger.error("Error parsing Google Scholar profile: %s", e)
         
         # Return minimal fallback data with an explicit since year (2020 as default)
         return {
@@ -479,84 +644,610 @@ def get_scholar_stats(scholar_id):
                 },
                 'citation_history': []
             },
-            'updated_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'scholar_id': scholar_id,
+            'updated_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'fallback': 'profile'
         }
 
-def save_json_data(data, filename="data/scholar_stats.json"):
+def save_json_data(data, filename=DEFAULT_OUTPUT):
     """Save data to JSON file"""
     # Ensure directory exists
     directory = os.path.dirname(filename)
     
     if not os.path.exists(directory):
-        logger.info(f"Creating directory: {directory}")
+        logger.info("Creating directory: %s", directory)
         os.makedirs(directory, exist_ok=True)
     else:
-        logger.info(f"Directory already exists: {directory}")
+        logger.info("Directory already exists: %s", directory)
     
     # Check if we can write to the location
     try:
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Data successfully saved to {filename}")
+        logger.info("Data successfully saved to %s", filename)
     except Exception as e:
-        logger.error(f"Error saving data to {filename}: {e}")
+        logger.error("Error saving data to %s: %s", filename, e)
         raise
     
     # Verify file exists after saving
     if os.path.exists(filename):
         file_size = os.path.getsize(filename)
-        logger.info(f"Verified file exists: {filename} (Size: {file_size} bytes)")
+        logger.info("Verified file exists: %s (Size: %s bytes)", filename, file_size)
+    else:
+        logger.error("File does not exist after saving: %s", filename)
+
+def dashboard_filename(filename=DEFAULT_OUTPUT):
+    """Path of the minified dashboard payload that sits next to the full JSON"""
+    return os.path.splitext(filename)[0] + '.min.json'
+
+def build_dashboard_payload(data, start_year=DASHBOARD_START_YEAR):
+    """Build the chart-ready payload consumed by js/chart.js
+    
+    citation_history is flattened into parallel, year-sorted 'years' and
+    'citations' arrays, and 'windows' maps each precomputed view to the index
+    its slice starts at, so the browser doesn't rebuild or filter anything.
+    """
+    profile = data.get('profile', {})
+    metrics = data.get('metrics', {})
+    
+    history = []
+    for item in metrics.get('citation_history', []):
+        try:
+            history.append((int(item['year']), int(item['citations'])))
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Skipping malformed history entry: %s", item)
+    history.sort()
+    
+    years = [year for year, _ in history]
+    citations = [count for _, count in history]
+    
+    def first_index(from_year):
+        return next((i for i, year in enumerate(years) if year >= from_year), len(years))
+    
+    windows = {'all': 0}
+    if years:
+        windows['last_5'] = first_index(years[-1] - 4)
+        windows['last_10'] = first_index(years[-1] - 9)
+    windows[f'since_{start_year}'] = first_index(start_year)
+    
+    return {
+        'scholar_id': data.get('scholar_id'),
+        'name': profile.get('name'),
+        'affiliation': profile.get('affiliation'),
+        'interests': profile.get('interests', []),
+        'citation_stats': metrics.get('citation_stats', {}),
+        'updated_at': data.get('updated_at'),
+        'years': years,
+        'citations': citations,
+        'windows': windows
+    }
+
+def write_compressed_siblings(filename, payload):
+    """Write .gz (and .br when brotli is installed) copies of payload next to filename"""
+    written = []
+    
+    # mtime=0 keeps the gzip bytes stable so unchanged data doesn't produce a new commit
+    with open(filename + '.gz', 'wb') as f:
+        f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+    written.append(filename + '.gz')
+    
+    try:
+        import brotli
+    except ImportError:
+        logger.debug("brotli not installed, skipping .br output")
+    else:
+        with open(filename + '.br', 'wb') as f:
+            f.write(brotli.compress(payload, quality=11))
+        written.append(filename + '.br')
+    
+    return written
+
+def save_dashboard_payload(data, filename=None):
+    """Save the minified dashboard payload and its pre-compressed siblings"""
+    filename = filename or dashboard_filename()
+    payload = json.dumps(build_dashboard_payload(data), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    try:
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(filename, 'wb') as f:
+            f.write(payload)
+        written = write_compressed_siblings(filename, payload)
+    except Exception as e:
+        logger.error("Error saving dashboard payload to %s: %s", filename, e)
+        raise
+    
+    logger.info("Dashboard payload saved to %s (%s bytes) with %s", filename, len(payload), ', '.join(written))
+
+def load_manifest(filename=DEFAULT_MANIFEST):
+    """Load the shard manifest, or an empty one if it doesn't exist yet"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {'profiles': {}}
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read manifest %s, starting a new one: %s", filename, e)
+        return {'profiles': {}}
+    
+    manifest.setdefault('profiles', {})
+    return manifest
+
+def save_profile_shard(data, manifest, shard_dir=DEFAULT_SHARD_DIR, manifest_file=DEFAULT_MANIFEST):
+    """Write one profile's dashboard payload to a content-hashed shard and update its manifest entry
+    
+    The content hash is part of the file name, so shards never change once
+    written and can be served with long-lived immutable cache headers. Only
+    the small manifest has to be revalidated by browsers. updated_at lives
+    only in the manifest entry, so a re-scrape with unchanged data keeps its
+    shard.
+    """
+    scholar_id = data['scholar_id']
+    shard = build_dashboard_payload(data)
+    del shard['updated_at']
+    payload = json.dumps(shard, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    content_hash = hashlib.sha256(payload).hexdigest()[:16]
+    filename = os.path.join(shard_dir, f"{scholar_id}.{content_hash}.json")
+    
+    try:
+        os.makedirs(shard_dir, exist_ok=True)
+        if not os.path.exists(filename):
+            with open(filename, 'wb') as f:
+                f.write(payload)
+            write_compressed_siblings(filename, payload)
+    except Exception as e:
+        logger.error("Error saving profile shard to %s: %s", filename, e)
+        raise
+    
+    manifest_dir = os.path.dirname(manifest_file) or '.'
+    previous = manifest['profiles'].get(scholar_id, {})
+    manifest['profiles'][scholar_id] = {
+        'name': data.get('profile', {}).get('name'),
+        'affiliation': data.get('profile', {}).get('affiliation'),
+        **headline_metrics(data),
+        'updated_at': data.get('updated_at'),
+        'hash': content_hash,
+        'path': os.path.relpath(filename, manifest_dir).replace(os.sep, '/')
+    }
+    logger.info("Profile shard saved to %s (%s bytes)", filename, len(payload))
+    
+    # Return the superseded shard so it can be removed once the new manifest is on disk
+    if previous.get('path') and previous.get('hash') != content_hash:
+        return os.path.join(manifest_dir, previous['path'])
+    return None
+
+def save_manifest(manifest, filename=DEFAULT_MANIFEST, stale_shards=()):
+    """Write the shard manifest, then delete shards it no longer references"""
+    manifest['generated_at'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    try:
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    except Exception as e:
+        logger.error("Error saving manifest to %s: %s", filename, e)
+        raise
+    
+    logger.info("Manifest saved to %s (%s profiles)", filename, len(manifest['profiles']))
+    
+    for shard in stale_shards:
+        for path in (shard, shard + '.gz', shard + '.br'):
+            if os.path.exists(path):
+                os.remove(path)
+                logger.info("Removed superseded shard %s", path)
+
+def manifest_entry_age_hours(manifest, scholar_id):
+    """Age in hours of a profile's manifest entry, or None if it has none"""
+    updated_at = parse_updated_at(manifest['profiles'].get(scholar_id, {}))
+    if updated_at is None:
+        return None
+    return (datetime.datetime.now() - updated_at).total_seconds() / 3600
+
+def is_fresh(age_hours, max_age_hours):
+    """Whether data of the given age may be reused under --max-age"""
+    return age_hours is not None and 0 <= age_hours < max_age_hours
+
+def check_cache(scholar_id, filename=DEFAULT_OUTPUT, max_age_hours=0):
+    """Describe the saved stats for scholar_id: missing, unreadable, other_profile, stale or fresh"""
+    cache = {'state': 'missing', 'age_hours': None, 'data': None}
+    
+    if not os.path.exists(filename):
+        return cache
+    
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read cached stats from %s: %s", filename, e)
+        cache['state'] = 'unreadable'
+        return cache
+    
+    # Files written before 'scholar_id' was recorded are assumed to be ours
+    if data.get('scholar_id', scholar_id) != scholar_id:
+        cache['state'] = 'other_profile'
+        return cache
+    
+    updated_at = parse_updated_at(data)
+    if updated_at is None:
+        cache['state'] = 'unreadable'
+        return cache
+    
+    age_hours = (datetime.datetime.now() - updated_at).total_seconds() / 3600
+    cache['age_hours'] = age_hours
+    cache['data'] = data
+    cache['state'] = 'fresh' if is_fresh(age_hours, max_age_hours) else 'stale'
+    return cache
+
+def probe_profile(scholar_id, timeout=10, max_bytes=65536):
+    """Make one lightweight request to the profile page and classify the response
+    
+    Only the first chunk of the body is read, which is enough to spot the
+    captcha interstitial. Returns a (state, detail) tuple where state is one of
+    'ok', 'blocked', 'not_found', 'error' or 'unreachable'.
+    """
+    from transport import TransportError, get_default_transport
+    
+    url = PROFILE_URL.format(scholar_id=scholar_id)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+    }
+    
+    try:
+        with get_default_transport().stream(url, headers=headers, timeout=timeout, chunk_size=max_bytes) as response:
+            head = next(response.chunks, b'')
+    except TransportError as e:
+        return 'unreachable', str(e)
+    
+    status = response.status_code
+    text = head.decode('utf-8', errors='replace')
+    
+    if status in (403, 429) or any(marker in response.url or marker in text for marker in BLOCK_MARKERS):
+        return 'blocked', f"HTTP {status}"
+    if status == 404:
+        return 'not_found', f"HTTP {status}"
+    if status >= 400:
+        return 'error', f"HTTP {status}"
+    return 'ok', f"HTTP {status}"
+
+def run_preflight(args):
+    """Check config, cache state and reachability without running a full fetch
+    
+    Exit codes: 0 ready to fetch (or cache is fresh), 1 config error,
+    2 blocked by Google Scholar, 3 profile missing or Scholar unreachable.
+    """
+    print(f"\n--- Preflight ---")
+    
+    try:
+        scholar_ids = load_scholar_ids(args.ids_file)
+    except EnvironmentError as e:
+        logger.error(e)
+        print("Config: FAILED")
+        return 1
+    
+    if len(scholar_ids) > 1 and not args.sharded:
+        logger.error("Several scholar IDs given, use --sharded output")
+        print("Config: FAILED")
+        return 1
+    
+    print(f"Config: OK ({len(scholar_ids)} scholar ID(s), first: {scholar_ids[0]})")
+    
+    if args.sharded:
+        manifest = load_manifest(args.manifest)
+        stale_ids = [scholar_id for scholar_id in scholar_ids
+                     if not is_fresh(manifest_entry_age_hours(manifest, scholar_id), args.max_age)]
+        print(f"Cache: {len(scholar_ids) - len(stale_ids)} fresh, {len(stale_ids)} to fetch ({args.manifest})")
     else:
-        logger.error(f"File does not exist after saving: {filename}")
+        cache = check_cache(scholar_ids[0], args.output, args.max_age)
+        if cache['age_hours'] is not None:
+            print(f"Cache: {cache['state']} ({args.output}, {cache['age_hours']:.1f} hours old)")
+        else:
+            print(f"Cache: {cache['state']} ({args.output})")
+        stale_ids = [] if cache['state'] == 'fresh' else scholar_ids
+    
+    if not stale_ids:
+        print("Result: cached stats are fresh, no fetch needed")
+        return 0
+    
+    state, detail = probe_profile(stale_ids[0])
+    print(f"Probe: {state} ({detail})")
+    
+    if state == 'ok':
+        print("Result: ready to fetch")
+        return 0
+    if state == 'blocked':
+        print("Result: Google Scholar is blocking requests, skip this cycle")
+        return 2
+    print("Result: profile not reachable")
+    return 3
+
+def print_summary(scholar_stats):
+    """Print a profile summary for GitHub Actions logs"""
+    print(f"\n--- Scholar Profile Summary ---")
+    print(f"Name: {scholar_stats['profile'].get('name', 'N/A')}")
+    print(f"Affiliation: {scholar_stats['profile'].get('affiliation', 'N/A')}")
+    print(f"Source: {scholar_stats.get('source', 'unknown')}")
+    
+    citation_stats = scholar_stats['metrics'].get('citation_stats', {})
+    if 'Citations' in citation_stats:
+        citations = citation_stats['Citations']
+        print(f"Total Citations: {citations.get('all', 'N/A')}")
+        for key, value in citations.items():
+            if key != 'all':
+                print(f"Citations {key}: {value}")
+    
+    if 'h-index' in citation_stats:
+        h_index = citation_stats['h-index']
+        print(f"h-index: {h_index.get('all', 'N/A')}")
+    
+    if 'i10-index' in citation_stats:
+        i10_index = citation_stats['i10-index']
+        print(f"i10-index: {i10_index.get('all', 'N/A')}")
+        
+    history = scholar_stats['metrics'].get('citation_history', [])
+    print(f"Citation history data points: {len(history)}")
+
+def report_profile(scholar_stats, args, event='profile_saved'):
+    """print_summary() for text logs; a single structured record with --log-format json"""
+    if args.log_format != 'json':
+        print_summary(scholar_stats)
+        return
+    logger.info("%s %s", event, scholar_stats.get('scholar_id'),
+                extra={'scholar_id': scholar_stats.get('scholar_id'), 'event': event,
+                       'metrics': headline_metrics(scholar_stats)})
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Retrieve Google Scholar profile statistics")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help="JSON file to write (default: %(default)s)")
+    parser.add_argument('--ids-file', metavar='PATH',
+                        help="File with one scholar ID per line (default: SCHOLAR_IDS or SCHOLAR_ID)")
+    parser.add_argument('--sharded', action='store_true',
+                        help="Write one content-hashed file per profile plus a manifest instead of --output")
+    parser.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR,
+                        help="Directory for per-profile files in --sharded mode (default: %(default)s)")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST,
+                        help="Manifest file in --sharded mode (default: %(default)s)")
+    parser.add_argument('--transport', choices=('requests', 'httpx'), default='requests',
+                        help="HTTP backend: requests (HTTP/1.1) or httpx (HTTP/2, multiplexed; needs httpx[http2])")
+    parser.add_argument('--stream', action='store_true',
+                        help="Read only the profile header, stats table and histogram, then close the connection")
+    parser.add_argument('--archive-dir', metavar='PATH',
+                        help="Keep every fetched page in a deduplicated, compressed archive (e.g. data/archive)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="In --sharded mode, overlap fetching, parsing and writing in separate stages")
+    parser.add_argument('--fetch-workers', type=int, default=1,
+                        help="Concurrent fetch threads in --pipeline mode (default: %(default)s)")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="Parser processes in --pipeline mode (default: one per CPU)")
+    parser.add_argument('--negative-cache', default=DEFAULT_NEGATIVE_CACHE,
+                        help="Quarantine file for failing IDs in --sharded mode (default: %(default)s)")
+    parser.add_argument('--recheck-quarantined', action='store_true',
+                        help="Fetch quarantined IDs even before their re-check time")
+    parser.add_argument('--search-index', default=DEFAULT_SEARCH_INDEX,
+                        help="Search index updated with every saved profile (default: %(default)s)")
+    parser.add_argument('--groups', default=DEFAULT_GROUPS,
+                        help="Group definitions whose rollups are updated on save (default: %(default)s)")
+    parser.add_argument('--group-rollups', default=DEFAULT_ROLLUPS,
+                        help="Materialized group rollups (default: %(default)s)")
+    parser.add_argument('--max-age', type=float, default=0, metavar='HOURS',
+                        help="Reuse saved stats younger than this many hours instead of fetching")
+    parser.add_argument('--history-dir', default=DEFAULT_HISTORY_DIR,
+                        help="Directory of per-profile snapshots used for change detection (default: %(default)s)")
+    parser.add_argument('--change-log', default=DEFAULT_CHANGE_LOG,
+                        help="File that receives one line per change or anomaly (default: %(default)s)")
+    parser.add_argument('--z-threshold', type=float, default=DEFAULT_Z_THRESHOLD,
+                        help="Flag yearly counts this many standard deviations above the previous history (default: %(default)s)")
+    parser.add_argument('--accept-anomalies', action='store_true',
+                        help="Save new data even if it is fallback data or a regression")
+    parser.add_argument('--confirm-runs', type=int, default=DEFAULT_CONFIRM_RUNS, metavar='N',
+                        help="Accept a metric drop or history rewrite seen on N consecutive runs, 0 never (default: %(default)s)")
+    parser.add_argument('--no-diff', action='store_true',
+                        help="Skip change detection and always save new data")
+    parser.add_argument('--preflight', action='store_true',
+                        help="Check config, cache state and reachability, then exit without fetching")
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help="'json' writes one structured record per line for batch runs (default: %(default)s)")
+    parser.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'), default='INFO',
+                        help="Minimum level logged; DEBUG includes per-element parse details (default: %(default)s)")
+    parser.add_argument('--log-burst', type=int, default=DEFAULT_BURST,
+                        help="With --log-format json, records per message per interval (default: %(default)s)")
+    parser.add_argument('--log-interval', type=float, default=DEFAULT_INTERVAL, metavar='SECONDS',
+                        help="Rate-limit window for --log-burst (default: %(default)s)")
+    return parser.parse_args(argv)
+
+def review_stats(scholar_stats, args):
+    """Run change detection on a new scrape; True if it may replace the saved data"""
+    if args.no_diff:
+        return True
+    return review_snapshot(scholar_stats, args.history_dir, args.change_log,
+                           args.z_threshold, args.accept_anomalies, args.confirm_runs)
+
+def update_group_rollups(scholar_stats, args):
+    """Fold one saved profile into the rollups of the groups it belongs to"""
+    from group_rollups import load_groups, load_rollups, save_rollups, sync_groups, update_member
+    
+    groups = load_groups(args.groups)
+    if not groups:
+        return
+    rollups = load_rollups(args.group_rollups)
+    sync_groups(rollups, groups, args.history_dir)
+    update_member(rollups, groups, scholar_stats)
+    save_rollups(rollups, args.group_rollups)
+
+def parse_profile_in_context(html, scholar_id):
+    """parse_scholar_html() with the profile context set, for pipeline parse workers"""
+    with profile_context(scholar_id):
+        return parse_scholar_html(html, scholar_id)
+
+def run_sharded(scholar_ids, args, clock=None):
+    """Fetch each profile into its own shard and update the manifest once at the end
+    
+    With --pipeline, fetching, parsing and writing run as overlapping stages
+    (see pipeline.py); otherwise profiles are processed one after another.
+    IDs quarantined in the negative cache are skipped until their re-check time.
+    Blocked fetches only count against their IDs if some other fetch in the
+    run got through, since a run where everything is blocked points at the IP.
+    Group rollups of the saved profiles are updated as each one is saved.
+    """
+    from group_rollups import load_groups, load_rollups, save_rollups, sync_groups, update_member
+    from negative_cache import (is_quarantined, load_negative_cache, record_failure, record_result,
+                                save_negative_cache, was_answered)
+    
+    manifest = load_manifest(args.manifest)
+    negative_cache = load_negative_cache(args.negative_cache)
+    search_index = load_index(args.search_index)
+    groups = load_groups(args.groups)
+    rollups = load_rollups(args.group_rollups) if groups else {}
+    if groups:
+        sync_groups(rollups, groups, args.history_dir)
+    stale_shards = []
+    # Each list is filled by the thread fetching that ID and read by save() once the result is handed over
+    statuses_by_id = {}
+    blocked_ids = []
+    answered = False
+    
+    def record(scholar_id, scholar_stats):
+        nonlocal answered
+        statuses = statuses_by_id.pop(scholar_id, [])
+        answered = answered or was_answered(statuses)
+        failure_class = record_result(negative_cache, scholar_id, statuses, scholar_stats, record_blocked=False)
+        if failure_class == 'blocked':
+            blocked_ids.append(scholar_id)
+        return failure_class
+    
+    def pending_ids():
+        for scholar_id in scholar_ids:
+            age_hours = manifest_entry_age_hours(manifest, scholar_id)
+            if is_fresh(age_hours, args.max_age):
+                logger.info("Skipping %s, manifest entry is %.1f hours old", scholar_id, age_hours,
+                            extra={'scholar_id': scholar_id, 'event': 'skipped_fresh'})
+                continue
+            if not args.recheck_quarantined and is_quarantined(negative_cache, scholar_id):
+                entry = negative_cache[scholar_id]
+                logger.info("Skipping %s, quarantined (%s) until %s", scholar_id, entry['class'], entry['recheck_at'],
+                            extra={'scholar_id': scholar_id, 'event': 'skipped_quarantined'})
+                continue
+            logger.info("Retrieving stats for Scholar ID: %s using direct connection", scholar_id,
+                        extra={'scholar_id': scholar_id, 'event': 'fetch_started'})
+            yield scholar_id
+    
+    def save(scholar_id, scholar_stats):
+        # Also called with None for failed fetches, so the negative cache is only touched here
+        if scholar_stats is None:
+            fetch_failed(scholar_id)
+            return
+        with profile_context(scholar_id):
+            if record(scholar_id, scholar_stats):
+                return
+            if not review_stats(scholar_stats, args):
+                return
+            stale_shard = save_profile_shard(scholar_stats, manifest, args.shard_dir, args.manifest)
+            if stale_shard:
+                stale_shards.append(stale_shard)
+            update_profile(search_index, scholar_stats)
+            update_member(rollups, groups, scholar_stats)
+            report_profile(scholar_stats, args)
+    
+    def fetch_failed(scholar_id):
+        logger.error("Failed to retrieve stats for Scholar ID: %s", scholar_id,
+                     extra={'scholar_id': scholar_id, 'event': 'fetch_failed'})
+        record(scholar_id, None)
+    
+    def fetch(scholar_id):
+        statuses = statuses_by_id.setdefault(scholar_id, [])
+        with profile_context(scholar_id):
+            return fetch_profile_html(scholar_id, clock, args.stream, archive_dir=args.archive_dir,
+                                      statuses=statuses)
+    
+    if args.pipeline:
+        from pipeline import run_pipeline
+        run_pipeline(pending_ids(), fetch, parse_profile_in_context, save,
+                     fetch_workers=args.fetch_workers, parse_workers=args.parse_workers)
+    else:
+        for scholar_id in pending_ids():
+            statuses = statuses_by_id.setdefault(scholar_id, [])
+            with profile_context(scholar_id):
+                scholar_stats = get_scholar_stats(scholar_id, clock, args.stream, args.archive_dir, statuses)
+            save(scholar_id, scholar_stats)
+    
+    if answered:
+        for scholar_id in blocked_ids:
+            record_failure(negative_cache, scholar_id, 'blocked')
+    elif blocked_ids:
+        logger.warning("Every fetch was blocked, not quarantining %s IDs (the runner IP is probably blocked)",
+                       len(blocked_ids))
+    
+    save_manifest(manifest, args.manifest, stale_shards)
+    save_negative_cache(negative_cache, args.negative_cache)
+    save_index(search_index, args.search_index)
+    if groups:
+        save_rollups(rollups, args.group_rollups)
 
-def main():
+def main(argv=None):
     """Main function to retrieve Google Scholar stats using direct connection"""
+    args = parse_args(argv)
+    configure_logging(args.log_format, getattr(logging, args.log_level), args.log_burst, args.log_interval)
+    
+    if args.transport != 'requests':
+        from transport import TransportError, create_transport, set_default_transport
+        try:
+            set_default_transport(create_transport(args.transport))
+        except TransportError as e:
+            logger.error(e)
+            return 1
+    
+    if args.preflight:
+        return run_preflight(args)
+    
     try:
-        # Load environment variables
-        env_vars = load_environment_variables()
-        scholar_id = env_vars['SCHOLAR_ID']
+        # Load scholar IDs from --ids-file or environment variables
+        scholar_ids = load_scholar_ids(args.ids_file)
+        
+        if args.sharded:
+            run_sharded(scholar_ids, args)
+            return 0
+        
+        if len(scholar_ids) > 1:
+            logger.error("Several scholar IDs given, use --sharded output")
+            return 1
+        scholar_id = scholar_ids[0]
+        
+        # Serve from cache when the saved stats are recent enough
+        if args.max_age > 0:
+            cache = check_cache(scholar_id, args.output, args.max_age)
+            if cache['state'] == 'fresh':
+                logger.info("Using cached stats from %s (%.1f hours old)", args.output, cache['age_hours'])
+                report_profile(cache['data'], args, event='cache_hit')
+                return 0
         
         # Get scholar stats using direct connection (no proxy needed)
-        logger.info(f"Retrieving stats for Scholar ID: {scholar_id} using direct connection")
-        scholar_stats = get_scholar_stats(scholar_id)
+        logger.info("Retrieving stats for Scholar ID: %s using direct connection", scholar_id)
+        with profile_context(scholar_id):
+            scholar_stats = get_scholar_stats(scholar_id, stream=args.stream, archive_dir=args.archive_dir)
         
-        if scholar_stats:
+        if scholar_stats and not review_stats(scholar_stats, args):
+            logger.warning("Not saving flagged stats for Scholar ID: %s", scholar_id)
+        elif scholar_stats:
             # Save results
-            save_json_data(scholar_stats)
-            logger.info(f"Successfully retrieved stats for {scholar_stats['profile'].get('name', scholar_id)}")
-            
-            # Print summary for GitHub Actions logs
-            print(f"\n--- Scholar Profile Summary ---")
-            print(f"Name: {scholar_stats['profile'].get('name', 'N/A')}")
-            print(f"Affiliation: {scholar_stats['profile'].get('affiliation', 'N/A')}")
-            print(f"Source: {scholar_stats.get('source', 'unknown')}")
-            
-            citation_stats = scholar_stats['metrics'].get('citation_stats', {})
-            if 'Citations' in citation_stats:
-                citations = citation_stats['Citations']
-                print(f"Total Citations: {citations.get('all', 'N/A')}")
-                for key, value in citations.items():
-                    if key != 'all':
-                        print(f"Citations {key}: {value}")
-            
-            if 'h-index' in citation_stats:
-                h_index = citation_stats['h-index']
-                print(f"h-index: {h_index.get('all', 'N/A')}")
-            
-            if 'i10-index' in citation_stats:
-                i10_index = citation_stats['i10-index']
-                print(f"i10-index: {i10_index.get('all', 'N/A')}")
-                
-            history = scholar_stats['metrics'].get('citation_history', [])
-            print(f"Citation history data points: {len(history)}")
-            
+            save_json_data(scholar_stats, args.output)
+            save_dashboard_payload(scholar_stats, dashboard_filename(args.output))
+            search_index = load_index(args.search_index)
+            update_profile(search_index, scholar_stats)
+            save_index(search_index, args.search_index)
+            update_group_rollups(scholar_stats, args)
+            logger.info("Successfully retrieved stats for %s", scholar_stats['profile'].get('name', scholar_id))
+            report_profile(scholar_stats, args)
         else:
-            logger.error(f"Failed to retrieve stats for Scholar ID: {scholar_id}")
+            logger.error("Failed to retrieve stats for Scholar ID: %s", scholar_id)
         
     except EnvironmentError as e:
         logger.error(e)
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
+    
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
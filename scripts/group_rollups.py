@@ -0,0 +1,233 @@
+"""Materialized aggregates over named groups of scholar IDs
+
+Groups (departments, labs) are defined in data/groups.json as
+{"group name": ["scholar_id", ...]}. For every group, data/group_rollups.json
+keeps each member's last contribution plus the running aggregates: summed
+citation history per year, metric totals, sorted metric columns, and a
+precomputed summary with medians and top-N. Saving one member's new snapshot
+subtracts its old contribution and adds the new one, so reports read the
+summary directly instead of recomputing from every profile.
+
+    python scripts/group_rollups.py --group "Economics"
+    python scripts/group_rollups.py --rebuild
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+from snapshot_diff import DEFAULT_HISTORY_DIR, history_counts, load_previous_snapshot
+from stats_utils import headline_metrics, insert_into_column, load_column, remove_from_column
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUPS = "data/groups.json"
+DEFAULT_ROLLUPS = "data/group_rollups.json"
+DEFAULT_TOP_N = 5
+METRICS = ('citations', 'h_index', 'i10_index')
+
+def load_groups(filename=DEFAULT_GROUPS):
+    """Read the group definitions; returns {group: [scholar_id, ...]}"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return {name: list(dict.fromkeys(members)) for name, members in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+
+def new_rollup():
+    """An empty group rollup"""
+    return {
+        'members': {},
+        'history': {},
+        'totals': {metric: 0 for metric in METRICS},
+        'columns': {metric: [] for metric in METRICS},
+        'summary': {}
+    }
+
+def load_rollups(filename=DEFAULT_ROLLUPS):
+    """Load the rollups, or none if they don't exist yet"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            rollups = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read group rollups %s, starting empty: %s", filename, e)
+        return {}
+
+    for rollup in rollups.values():
+        rollup['columns'] = {metric: load_column(rollup['columns'].get(metric, [])) for metric in METRICS}
+    return rollups
+
+def save_rollups(rollups, filename=DEFAULT_ROLLUPS):
+    """Write the rollups"""
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(rollups, f, ensure_ascii=False, separators=(',', ':'))
+
+def member_contribution(data):
+    """What one profile adds to its groups: headline metrics and per-year citations"""
+    return {**headline_metrics(data), 'name': data.get('profile', {}).get('name') or '',
+            'history': history_counts(data)}
+
+def median(values):
+    """Median of an already sorted list of (value, scholar_id) entries"""
+    if not values:
+        return None
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle][0]
+    return (values[middle - 1][0] + values[middle][0]) / 2
+
+def refresh_summary(rollup, top_n=DEFAULT_TOP_N):
+    """Recompute the summary from the running aggregates (cost independent of group size)"""
+    members = rollup['members']
+    rollup['summary'] = {
+        'members': len(members),
+        'totals': dict(rollup['totals']),
+        'medians': {metric: median(rollup['columns'][metric]) for metric in METRICS},
+        'top': {metric: [{'scholar_id': scholar_id, 'name': members[scholar_id]['name'], metric: value}
+                         for value, scholar_id in reversed(rollup['columns'][metric][-top_n:])]
+                for metric in METRICS},
+        'history': dict(sorted(rollup['history'].items()))
+    }
+
+def remove_member(rollup, scholar_id):
+    """Subtract a member's contribution from the aggregates"""
+    contribution = rollup['members'].pop(scholar_id, None)
+    if not contribution:
+        return
+
+    for year, count in contribution['history'].items():
+        remaining = rollup['history'].get(year, 0) - count
+        if remaining:
+            rollup['history'][year] = remaining
+        else:
+            rollup['history'].pop(year, None)
+
+    for metric in METRICS:
+        value = contribution[metric]
+        if value is None:
+            continue
+        rollup['totals'][metric] -= value
+        remove_from_column(rollup['columns'][metric], value, scholar_id)
+
+def add_member(rollup, scholar_id, contribution):
+    """Add a member's contribution to the aggregates"""
+    rollup['members'][scholar_id] = contribution
+
+    for year, count in contribution['history'].items():
+        rollup['history'][year] = rollup['history'].get(year, 0) + count
+
+    for metric in METRICS:
+        value = contribution[metric]
+        if value is not None:
+            rollup['totals'][metric] += value
+            insert_into_column(rollup['columns'][metric], value, scholar_id)
+
+def update_member(rollups, groups, data, top_n=DEFAULT_TOP_N):
+    """Replace one profile's contribution in every group it belongs to
+
+    Snapshots with fallback data are ignored, so synthetic history never
+    reaches the group sums. Returns the names of the groups updated.
+    """
+    scholar_id = data['scholar_id']
+    if data.get('fallback'):
+        logger.debug("Not rolling up fallback data for %s", scholar_id)
+        return []
+
+    updated = []
+    contribution = member_contribution(data)
+    for name, members in groups.items():
+        if scholar_id not in members:
+            continue
+        rollup = rollups.setdefault(name, new_rollup())
+        remove_member(rollup, scholar_id)
+        add_member(rollup, scholar_id, contribution)
+        refresh_summary(rollup, top_n)
+        updated.append(name)
+    return updated
+
+def sync_groups(rollups, groups, history_dir=DEFAULT_HISTORY_DIR, top_n=DEFAULT_TOP_N):
+    """Bring the rollups in line with edited group definitions
+
+    Groups that were removed are dropped, members that left a group are
+    subtracted, and new members are added from their latest saved snapshot.
+    Only the members that changed are touched.
+    """
+    for name in set(rollups) - set(groups):
+        del rollups[name]
+        logger.info("Dropped rollup for removed group %s", name)
+
+    for name, members in groups.items():
+        rollup = rollups.setdefault(name, new_rollup())
+        changed = False
+
+        for scholar_id in set(rollup['members']) - set(members):
+            remove_member(rollup, scholar_id)
+            changed = True
+
+        for scholar_id in members:
+            if scholar_id in rollup['members']:
+                continue
+            snapshot = load_previous_snapshot(scholar_id, history_dir)
+            if snapshot and not snapshot.get('fallback'):
+                add_member(rollup, scholar_id, member_contribution(snapshot))
+                changed = True
+
+        if changed or not rollup['summary']:
+            refresh_summary(rollup, top_n)
+
+def rebuild_rollups(groups, history_dir=DEFAULT_HISTORY_DIR, top_n=DEFAULT_TOP_N):
+    """Build every group's rollup from scratch out of the snapshot history"""
+    rollups = {}
+    sync_groups(rollups, groups, history_dir, top_n)
+    return rollups
+
+def print_rollup(name, summary):
+    """Print one group's summary"""
+    print(f"\n--- {name} ({summary['members']} members) ---")
+    for metric in METRICS:
+        top = ', '.join(f"{entry['name'] or entry['scholar_id']} ({entry[metric]})"
+                        for entry in summary['top'][metric])
+        print(f"{metric}: total {summary['totals'][metric]}, median {summary['medians'][metric]}; top: {top}")
+    if summary['history']:
+        print("Citations per year: " + ', '.join(f"{year}: {count}" for year, count in summary['history'].items()))
+
+def main(argv=None):
+    """Show or rebuild the group rollups"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Show department/lab aggregates over groups of profiles")
+    parser.add_argument('--groups', default=DEFAULT_GROUPS,
+                        help="Group definitions (default: %(default)s)")
+    parser.add_argument('--rollups', default=DEFAULT_ROLLUPS,
+                        help="Materialized rollups (default: %(default)s)")
+    parser.add_argument('--group', action='append', default=[],
+                        help="Group to show (repeatable; default: all)")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild every rollup from the snapshot history first")
+    parser.add_argument('--history-dir', default=DEFAULT_HISTORY_DIR,
+                        help="Snapshot history used for new members and --rebuild (default: %(default)s)")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP_N,
+                        help="Members listed per metric after a rebuild (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    groups = load_groups(args.groups)
+    if args.rebuild:
+        rollups = rebuild_rollups(groups, args.history_dir, args.top)
+        save_rollups(rollups, args.rollups)
+        logger.info("Rebuilt %s for %s groups", args.rollups, len(rollups))
+    else:
+        rollups = load_rollups(args.rollups)
+
+    unknown = [name for name in args.group if name not in rollups]
+    if unknown:
+        parser.error(f"no rollup for group(s): {', '.join(unknown)}")
+
+    for name in args.group or sorted(rollups):
+        print_rollup(name, rollups[name]['summary'])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
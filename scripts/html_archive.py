@@ -0,0 +1,182 @@
+"""Content-addressed, compressed archive of fetched profile pages
+
+Pages are normalised (scripts, styles, nonces and anti-CSRF tokens removed,
+whitespace between tags collapsed), hashed with SHA-256 and stored once under
+objects/<hash[:2]>/<hash>.html.<ext>. index.jsonl maps every
+(scholar_id, fetched_at) to a content hash, so a daily fetch of an unchanged
+profile only adds one index line. Pages cut short by a streaming fetch are
+marked 'partial' in the index and skipped when replaying. Objects are compressed with zstd when the
+zstandard package is installed and lzma otherwise.
+
+Run `python scripts/html_archive.py stats` for a summary or
+`python scripts/html_archive.py bench` to time the parser over the archive.
+"""
+import os
+import re
+import sys
+import json
+import lzma
+import hashlib
+import logging
+import datetime
+import argparse
+import threading
+
+from stats_utils import TIMESTAMP_FORMAT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = "data/archive"
+
+# Markup that changes on every request without changing the profile
+VOLATILE_PATTERNS = [
+    re.compile(r'<script\b[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<style\b[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<input\b[^>]*\btype="hidden"[^>]*>', re.IGNORECASE),
+    re.compile(r'\snonce="[^"]*"', re.IGNORECASE),
+]
+WHITESPACE_BETWEEN_TAGS = re.compile(r'>\s+<')
+
+# Only one thread at a time may append to the index
+_index_lock = threading.Lock()
+
+def normalize_html(html):
+    """Strip volatile markup so identical profiles produce identical bytes"""
+    for pattern in VOLATILE_PATTERNS:
+        html = pattern.sub('', html)
+    return WHITESPACE_BETWEEN_TAGS.sub('><', html).strip()
+
+def _codec():
+    """Return (extension, compress, decompress) for the best available compressor"""
+    try:
+        import zstandard
+    except ImportError:
+        return 'xz', lambda data: lzma.compress(data, preset=9), lzma.decompress
+    return ('zst', lambda data: zstandard.ZstdCompressor(level=19).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+def object_path(content_hash, archive_dir=DEFAULT_ARCHIVE_DIR, extension=None):
+    """Path of the stored object for a content hash"""
+    extension = extension or _codec()[0]
+    return os.path.join(archive_dir, 'objects', content_hash[:2], f"{content_hash}.html.{extension}")
+
+def archive_page(scholar_id, html, archive_dir=DEFAULT_ARCHIVE_DIR, fetched_at=None, partial=False):
+    """Store a fetched page unless an identical one is already archived
+
+    partial marks a page prefix from a streaming fetch. Returns the content
+    hash recorded in the index.
+    """
+    extension, compress, _ = _codec()
+    payload = normalize_html(html).encode('utf-8')
+    content_hash = hashlib.sha256(payload).hexdigest()
+    path = object_path(content_hash, archive_dir, extension)
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write under a temporary name so readers never see a partial object
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(compress(payload))
+        os.replace(temp_path, path)
+        logger.info("Archived new page for %s as %s (%s bytes)", scholar_id, content_hash[:12], len(payload))
+    else:
+        logger.info("Page for %s unchanged, archive already holds %s", scholar_id, content_hash[:12])
+
+    record = {
+        'scholar_id': scholar_id,
+        'fetched_at': fetched_at or datetime.datetime.now().strftime(TIMESTAMP_FORMAT),
+        'hash': content_hash,
+        'bytes': len(payload)
+    }
+    if partial:
+        record['partial'] = True
+    with _index_lock:
+        with open(os.path.join(archive_dir, 'index.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    return content_hash
+
+def load_page(content_hash, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """Return the normalised HTML stored under content_hash"""
+    for extension, _, decompress in (_codec(), ('xz', None, lzma.decompress)):
+        path = object_path(content_hash, archive_dir, extension)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return decompress(f.read()).decode('utf-8')
+    raise FileNotFoundError(f"No archived page with hash {content_hash}")
+
+def iter_index(archive_dir=DEFAULT_ARCHIVE_DIR, scholar_id=None):
+    """Yield index records, optionally only those of one profile"""
+    try:
+        with open(os.path.join(archive_dir, 'index.jsonl'), 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if scholar_id is None or record['scholar_id'] == scholar_id:
+                    yield record
+    except FileNotFoundError:
+        return
+
+def iter_pages(archive_dir=DEFAULT_ARCHIVE_DIR, scholar_id=None, unique=True, include_partial=False):
+    """Yield (record, html) for archived pages, for replaying fetches or re-parsing
+
+    With unique=True each distinct page is yielded once, under its first index
+    record. Partial pages from streaming fetches are skipped unless include_partial.
+    """
+    seen = set()
+    for record in iter_index(archive_dir, scholar_id):
+        if record.get('partial') and not include_partial:
+            continue
+        if unique:
+            if record['hash'] in seen:
+                continue
+            seen.add(record['hash'])
+        yield record, load_page(record['hash'], archive_dir)
+
+def archive_stats(archive_dir=DEFAULT_ARCHIVE_DIR):
+    """Summarise fetch count, unique pages and bytes on disk"""
+    records = list(iter_index(archive_dir))
+    hashes = {record['hash'] for record in records}
+    stored = 0
+    for root, _, files in os.walk(os.path.join(archive_dir, 'objects')):
+        stored += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    raw = sum(record['bytes'] for record in records)
+    return {
+        'fetches': len(records),
+        'unique_pages': len(hashes),
+        'profiles': len({record['scholar_id'] for record in records}),
+        'partial_fetches': sum(1 for record in records if record.get('partial')),
+        'normalized_bytes_fetched': raw,
+        'bytes_stored': stored
+    }
+
+def main(argv=None):
+    """Print archive statistics or benchmark the parser over archived pages"""
+    parser = argparse.ArgumentParser(description="Inspect the raw HTML archive")
+    parser.add_argument('command', choices=('stats', 'bench'))
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR)
+    parser.add_argument('--scholar-id', help="Only use pages of this profile")
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        for key, value in archive_stats(args.archive_dir).items():
+            print(f"{key}: {value}")
+        return 0
+
+    import time
+    from get_scholar_stats import parse_scholar_html
+
+    logging.getLogger().setLevel(logging.WARNING)
+    pages = list(iter_pages(args.archive_dir, args.scholar_id))
+    start = time.perf_counter()
+    for record, html in pages:
+        parse_scholar_html(html, record['scholar_id'])
+    elapsed = time.perf_counter() - start
+
+    print(f"Parsed {len(pages)} unique pages in {elapsed:.3f} s"
+          + (f" ({elapsed / len(pages) * 1000:.1f} ms/page)" if pages else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
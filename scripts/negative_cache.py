@@ -0,0 +1,133 @@
+"""Persisted negative cache that quarantines failing scholar IDs
+
+Each failed fetch is classified as 'not_found' (HTTP 404), 'parse_failure'
+(the page had no profile to parse) or 'blocked' (every attempt got 403/429).
+The ID is then quarantined until a re-check time that doubles with every
+consecutive failure, so batch runs stop paying the full strategy cascade and
+its sleeps for dead IDs. A successful fetch clears the entry.
+
+Blocks usually hit the whole runner IP rather than one profile, so 'blocked'
+only quarantines after several consecutive blocked runs, with a short cap, and
+callers can skip recording it when every fetch of a run was blocked.
+"""
+import os
+import json
+import logging
+import datetime
+
+from stats_utils import TIMESTAMP_FORMAT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NEGATIVE_CACHE = "data/negative_cache.json"
+
+# First re-check interval per failure class, doubled on each consecutive failure
+BASE_RECHECK_HOURS = {
+    'not_found': 24,
+    'parse_failure': 12,
+    'blocked': 6,
+}
+MAX_RECHECK_HOURS = 30 * 24
+
+# Consecutive failures before an ID is quarantined, and per-class caps on the backoff
+QUARANTINE_AFTER = {'blocked': 3}
+CLASS_MAX_RECHECK_HOURS = {'blocked': 24}
+
+BLOCKED_STATUSES = (403, 429)
+
+def classify_failure(statuses, scholar_stats):
+    """Return the failure class of a fetch, or None if it succeeded or failed transiently
+
+    statuses are the HTTP status codes collected by get_html_content().
+    """
+    if 404 in statuses:
+        return 'not_found'
+    if scholar_stats is None:
+        if statuses and all(status in BLOCKED_STATUSES for status in statuses):
+            return 'blocked'
+        # Network errors say nothing about the ID itself
+        return None
+    if scholar_stats.get('fallback') == 'profile' or not scholar_stats.get('profile', {}).get('name'):
+        return 'parse_failure'
+    return None
+
+def was_answered(statuses):
+    """Whether any attempt got a response other than a block"""
+    return any(status not in BLOCKED_STATUSES for status in statuses)
+
+def load_negative_cache(filename=DEFAULT_NEGATIVE_CACHE):
+    """Load the negative cache, keyed by scholar ID"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read negative cache %s, starting empty: %s", filename, e)
+        return {}
+
+def save_negative_cache(cache, filename=DEFAULT_NEGATIVE_CACHE):
+    """Write the negative cache"""
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+def is_quarantined(cache, scholar_id, now=None):
+    """Whether scholar_id should be skipped until its re-check time"""
+    entry = cache.get(scholar_id)
+    if not entry:
+        return False
+    now = now or datetime.datetime.now()
+    return now < datetime.datetime.strptime(entry['recheck_at'], TIMESTAMP_FORMAT)
+
+def record_failure(cache, scholar_id, failure_class, now=None):
+    """Record a failure and push the re-check time out exponentially
+
+    Classes in QUARANTINE_AFTER are only counted until they reach that many
+    consecutive failures; until then the ID is not skipped.
+    """
+    now = now or datetime.datetime.now()
+    entry = cache.get(scholar_id, {})
+
+    # A different kind of failure starts a fresh backoff
+    failures = entry.get('failures', 0) + 1 if entry.get('class') == failure_class else 1
+    backoff_step = failures - QUARANTINE_AFTER.get(failure_class, 1)
+    if backoff_step < 0:
+        hours = 0
+    else:
+        hours = min(BASE_RECHECK_HOURS[failure_class] * 2 ** backoff_step,
+                    CLASS_MAX_RECHECK_HOURS.get(failure_class, MAX_RECHECK_HOURS))
+    recheck_at = now + datetime.timedelta(hours=hours)
+
+    cache[scholar_id] = {
+        'class': failure_class,
+        'failures': failures,
+        'first_failed_at': entry.get('first_failed_at') if failures > 1 else now.strftime(TIMESTAMP_FORMAT),
+        'last_failed_at': now.strftime(TIMESTAMP_FORMAT),
+        'recheck_at': recheck_at.strftime(TIMESTAMP_FORMAT)
+    }
+    if hours:
+        logger.warning("Quarantined %s (%s, failure %s) until %s", scholar_id, failure_class, failures,
+                       cache[scholar_id]['recheck_at'])
+    else:
+        logger.warning("Recorded %s failure %s for %s, not quarantined yet", failure_class, failures, scholar_id)
+
+def record_success(cache, scholar_id):
+    """Clear a scholar ID from the negative cache after a good fetch"""
+    if cache.pop(scholar_id, None):
+        logger.info("Released %s from quarantine", scholar_id)
+
+def record_result(cache, scholar_id, statuses, scholar_stats, now=None, record_blocked=True):
+    """Classify a fetch and update the cache; returns the failure class or None
+
+    With record_blocked=False a 'blocked' fetch is only classified, so the
+    caller can decide at the end of a run whether the block was IP-wide.
+    """
+    failure_class = classify_failure(statuses, scholar_stats)
+    if failure_class == 'blocked' and not record_blocked:
+        return failure_class
+    if failure_class:
+        record_failure(cache, scholar_id, failure_class, now)
+    elif scholar_stats is not None:
+        record_success(cache, scholar_id)
+    return failure_class
@@ -0,0 +1,138 @@
+"""Staged fetch -> parse -> write pipeline for batch runs
+
+Network fetches run on a small pool of threads, parsing runs in a process
+pool and all writes happen on the calling thread, so the network is never idle
+while BeautifulSoup works and vice versa. Stages are joined by bounded queues:
+when a downstream stage falls behind, upstream stages block instead of piling
+up pages in memory, so memory stays bounded however many IDs are queued.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 8
+
+# Marks the end of a stage's output
+_DONE = object()
+
+def _put(target, value, stop):
+    """Put value on a bounded queue, giving up once the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            target.put(value, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def run_pipeline(items, fetch, parse, write, fetch_workers=1, parse_workers=None,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+    """Run fetch(item) -> parse(fetched, item) -> write(item, parsed) over items
+
+    fetch runs on `fetch_workers` threads; when it returns None or raises,
+    write(item, None) is called instead, so failures are recorded on the
+    calling thread too. parse must be a picklable top-level function; it runs
+    in a process pool of `parse_workers` processes and may return None to skip
+    writing. write is only ever called from the calling thread, one item at a
+    time. items may be any iterable, including a lazy generator; it is consumed
+    only as fast as the pipeline drains. Returns the number of items written
+    with a parsed result.
+    """
+    item_queue = queue.Queue(maxsize=queue_size)
+    parse_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def feed():
+        for item in items:
+            if not _put(item_queue, item, stop):
+                return
+        for _ in range(fetch_workers):
+            _put(item_queue, _DONE, stop)
+
+    def fetch_worker():
+        while not stop.is_set():
+            try:
+                item = item_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                _put(parse_queue, _DONE, stop)
+                return
+            try:
+                fetched = fetch(item)
+            except Exception as e:
+                logger.error("Fetch stage failed for %s: %s", item, e)
+                fetched = None
+            _put(parse_queue, (item, fetched), stop)
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        def dispatch():
+            finished = 0
+            try:
+                while finished < fetch_workers and not stop.is_set():
+                    try:
+                        entry = parse_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if entry is _DONE:
+                        finished += 1
+                        continue
+                    item, fetched = entry
+                    if fetched is None:
+                        # Failed fetches go straight to the writer
+                        _put(write_queue, (item, None), stop)
+                        continue
+                    try:
+                        future = pool.submit(parse, fetched, item)
+                    except Exception as e:
+                        # e.g. BrokenProcessPool after a parse worker died; the writer logs it
+                        future = Future()
+                        future.set_exception(e)
+                    # Blocks while the writer is behind, which bounds pages in flight
+                    _put(write_queue, (item, future), stop)
+            finally:
+                _put(write_queue, _DONE, stop)
+
+        threads = [threading.Thread(target=feed, name='pipeline-feed', daemon=True)]
+        threads += [threading.Thread(target=fetch_worker, name=f'pipeline-fetch-{i}', daemon=True)
+                    for i in range(fetch_workers)]
+        dispatcher = threading.Thread(target=dispatch, name='pipeline-dispatch', daemon=True)
+        threads.append(dispatcher)
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    entry = write_queue.get(timeout=0.1)
+                except queue.Empty:
+                    # Never wait on a dispatcher that is gone without signalling the end
+                    if not dispatcher.is_alive() and write_queue.empty():
+                        logger.error("Parse dispatch stopped unexpectedly, ending the pipeline")
+                        break
+                    continue
+                if entry is _DONE:
+                    break
+                item, future = entry
+                if future is None:
+                    write(item, None)
+                    continue
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    logger.error("Parse stage failed for %s: %s", item, e)
+                    continue
+                if parsed is not None:
+                    write(item, parsed)
+                    written += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    return written
@@ -0,0 +1,211 @@
+"""Local search index over stored profiles
+
+Combines an inverted index of field-prefixed terms (name:, affiliation:,
+interest:) with sorted numeric columns for the headline metrics, so lookups
+like "interest 'Digital transformation'" or "affiliation RMIT and h_index > 15"
+never have to open the stored profile files. The index is updated in place
+whenever a profile is saved, and can be rebuilt from the snapshot history.
+
+    python scripts/search_index.py --interest "Digital transformation"
+    python scripts/search_index.py --affiliation RMIT --where "h_index>15"
+    python scripts/search_index.py --rebuild
+"""
+import os
+import re
+import sys
+import json
+import bisect
+import logging
+import argparse
+
+from snapshot_diff import DEFAULT_HISTORY_DIR, load_previous_snapshot
+from stats_utils import headline_metrics, insert_into_column, load_column, remove_from_column
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_INDEX = "data/search_index.json"
+TEXT_FIELDS = ('name', 'affiliation', 'interest')
+NUMERIC_COLUMNS = ('citations', 'h_index', 'i10_index')
+WHERE_PATTERN = re.compile(r'^\s*(\w+)\s*(>=|<=|>|<|=)\s*(\d+)\s*$')
+
+def tokenize(text):
+    """Lower-case word tokens of a piece of text"""
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+def new_index():
+    """An empty index"""
+    return {
+        'profiles': {},
+        'terms': {},
+        'columns': {column: [] for column in NUMERIC_COLUMNS}
+    }
+
+def load_index(filename=DEFAULT_SEARCH_INDEX):
+    """Load the index, or an empty one if it doesn't exist yet"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return new_index()
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read search index %s, starting empty: %s", filename, e)
+        return new_index()
+
+    index['columns'] = {column: load_column(index['columns'].get(column, [])) for column in NUMERIC_COLUMNS}
+    return index
+
+def save_index(index, filename=DEFAULT_SEARCH_INDEX):
+    """Write the index"""
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+
+def profile_terms(entry):
+    """Field-prefixed terms of an index entry, e.g. 'interest:digital'"""
+    terms = {f"name:{token}" for token in tokenize(entry['name'])}
+    terms.update(f"affiliation:{token}" for token in tokenize(entry['affiliation']))
+    for interest in entry['interests']:
+        terms.update(f"interest:{token}" for token in tokenize(interest))
+    return sorted(terms)
+
+def remove_profile(index, scholar_id):
+    """Drop a profile's terms and column values from the index"""
+    entry = index['profiles'].pop(scholar_id, None)
+    if not entry:
+        return
+
+    for term in profile_terms(entry):
+        postings = index['terms'].get(term, [])
+        position = bisect.bisect_left(postings, scholar_id)
+        if position < len(postings) and postings[position] == scholar_id:
+            postings.pop(position)
+        if not postings:
+            index['terms'].pop(term, None)
+
+    for column in NUMERIC_COLUMNS:
+        if entry.get(column) is not None:
+            remove_from_column(index['columns'][column], entry[column], scholar_id)
+
+def update_profile(index, data):
+    """Add or replace one profile from a stats dict produced by get_scholar_stats()"""
+    scholar_id = data['scholar_id']
+    remove_profile(index, scholar_id)
+
+    profile = data.get('profile', {})
+    entry = {
+        'name': profile.get('name') or '',
+        'affiliation': profile.get('affiliation') or '',
+        'interests': list(profile.get('interests') or []),
+        **headline_metrics(data)
+    }
+    index['profiles'][scholar_id] = entry
+
+    for term in profile_terms(entry):
+        bisect.insort(index['terms'].setdefault(term, []), scholar_id)
+    for column in NUMERIC_COLUMNS:
+        if entry[column] is not None:
+            insert_into_column(index['columns'][column], entry[column], scholar_id)
+
+def range_ids(index, column, low=None, high=None):
+    """IDs whose column value lies in [low, high] (either bound may be None)"""
+    values = index['columns'][column]
+    start = 0 if low is None else bisect.bisect_left(values, (low,))
+    end = len(values) if high is None else bisect.bisect_left(values, (high + 1,))
+    return {scholar_id for _, scholar_id in values[start:end]}
+
+def parse_where(condition):
+    """Turn 'h_index>15' into (column, low, high) with inclusive integer bounds"""
+    match = WHERE_PATTERN.match(condition)
+    if not match or match.group(1) not in NUMERIC_COLUMNS:
+        raise ValueError(f"Expected '<{'|'.join(NUMERIC_COLUMNS)}><op><number>', got {condition!r}")
+    column, operator, value = match.group(1), match.group(2), int(match.group(3))
+    return {
+        '>': (column, value + 1, None),
+        '>=': (column, value, None),
+        '<': (column, None, value - 1),
+        '<=': (column, None, value),
+        '=': (column, value, value),
+    }[operator]
+
+def search(index, name=None, affiliation=None, interest=None, where=()):
+    """Return {scholar_id: entry} for profiles matching every given filter
+
+    Text filters match all of their words within that field, and phrases are
+    checked against the stored text; where is a list of 'column<op>number'.
+    """
+    candidates = None
+
+    def narrow(ids):
+        nonlocal candidates
+        candidates = set(ids) if candidates is None else candidates & set(ids)
+
+    for field, text in zip(TEXT_FIELDS, (name, affiliation, interest)):
+        for token in tokenize(text):
+            narrow(index['terms'].get(f"{field}:{token}", ()))
+
+    for condition in where:
+        narrow(range_ids(index, *parse_where(condition)))
+
+    if candidates is None:
+        candidates = set(index['profiles'])
+
+    results = {}
+    for scholar_id in sorted(candidates):
+        entry = index['profiles'][scholar_id]
+        # Word matches can come from different interests; require the phrase in one of them
+        if interest and not any(interest.lower() in item.lower() for item in entry['interests']):
+            continue
+        results[scholar_id] = entry
+    return results
+
+def rebuild_index(history_dir=DEFAULT_HISTORY_DIR):
+    """Build a fresh index from the latest snapshot of every profile in the history"""
+    index = new_index()
+    if not os.path.isdir(history_dir):
+        logger.warning("No snapshot history in %s, the rebuilt index is empty", history_dir)
+        return index
+
+    for name in sorted(os.listdir(history_dir)):
+        if name.endswith('.jsonl'):
+            snapshot = load_previous_snapshot(name[:-len('.jsonl')], history_dir)
+            if snapshot and snapshot.get('scholar_id'):
+                update_profile(index, snapshot)
+    return index
+
+def main(argv=None):
+    """Query or rebuild the search index"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Search stored profiles by name, interest, affiliation and metrics")
+    parser.add_argument('--index', default=DEFAULT_SEARCH_INDEX,
+                        help="Index file (default: %(default)s)")
+    parser.add_argument('--name', help="Words in the scholar's name")
+    parser.add_argument('--affiliation', help="Words in the affiliation")
+    parser.add_argument('--interest', help="Phrase in one of the research interests")
+    parser.add_argument('--where', action='append', default=[],
+                        help="Metric filter such as 'h_index>15' or 'citations>=1000' (repeatable)")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild the index from the snapshot history first")
+    parser.add_argument('--history-dir', default=DEFAULT_HISTORY_DIR,
+                        help="Snapshot history used by --rebuild (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        index = rebuild_index(args.history_dir)
+        save_index(index, args.index)
+        logger.info("Rebuilt %s with %s profiles", args.index, len(index['profiles']))
+    else:
+        index = load_index(args.index)
+
+    try:
+        results = search(index, args.name, args.affiliation, args.interest, args.where)
+    except ValueError as e:
+        parser.error(str(e))
+
+    for scholar_id, entry in results.items():
+        print(f"{scholar_id}\t{entry['name']}\t{entry['affiliation']}\t"
+              f"citations={entry['citations']} h_index={entry['h_index']} i10_index={entry['i10_index']}")
+    print(f"{len(results)} matching profiles", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Compare each new scrape against the previous snapshot of the same profile
+
+Snapshots are appended one JSON line per run to <history_dir>/<scholar_id>.jsonl.
+Only the last line is read back, so the cost of a diff depends on the length of
+one citation history, not on how many runs have been archived.
+
+A drop in a headline metric or a rewritten history blocks the new scrape, but
+Scholar does lower counts for real (e.g. after merging duplicate papers). Such a
+scrape is accepted once the anomaly has persisted for `confirm_runs`
+consecutive runs, tracked in <history_dir>/<scholar_id>.pending.json.
+"""
+import os
+import json
+import logging
+import statistics
+
+from stats_utils import headline_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DIR = "data/history"
+DEFAULT_CHANGE_LOG = "data/changes.jsonl"
+DEFAULT_Z_THRESHOLD = 3.0
+DEFAULT_CONFIRM_RUNS = 3
+
+# Flags that mean the new scrape should not replace the saved data
+BLOCKING_FLAGS = ('fallback', 'regression', 'history_rewrite')
+# Blocking flags that are accepted once they persist; fallback data never is
+CONFIRMABLE_FLAGS = ('regression', 'history_rewrite')
+
+def history_path(scholar_id, history_dir=DEFAULT_HISTORY_DIR):
+    """Path of the snapshot file for one profile"""
+    return os.path.join(history_dir, f"{scholar_id}.jsonl")
+
+def pending_path(scholar_id, history_dir=DEFAULT_HISTORY_DIR):
+    """Path of the file counting consecutive runs with a confirmable anomaly"""
+    return os.path.join(history_dir, f"{scholar_id}.pending.json")
+
+def load_pending(scholar_id, history_dir=DEFAULT_HISTORY_DIR):
+    """Return the pending anomaly record for scholar_id, or None"""
+    try:
+        with open(pending_path(scholar_id, history_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read pending anomaly for %s: %s", scholar_id, e)
+        return None
+
+def save_pending(scholar_id, pending, history_dir=DEFAULT_HISTORY_DIR):
+    """Write the pending anomaly record, or remove it when pending is None"""
+    filename = pending_path(scholar_id, history_dir)
+    if pending is None:
+        if os.path.exists(filename):
+            os.remove(filename)
+        return
+    os.makedirs(history_dir, exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(pending, f, ensure_ascii=False)
+
+def read_last_line(filename, block_size=8192):
+    """Return the last non-empty line of a file, reading backwards from the end"""
+    with open(filename, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b''
+
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            lines = tail.rstrip(b'\n').split(b'\n')
+            # A complete last line needs a newline before it, or the start of the file
+            if len(lines) > 1 or position == 0:
+                return lines[-1].decode('utf-8') if lines[-1] else None
+
+    return None
+
+def load_previous_snapshot(scholar_id, history_dir=DEFAULT_HISTORY_DIR):
+    """Return the most recent stored snapshot for scholar_id, or None"""
+    filename = history_path(scholar_id, history_dir)
+
+    try:
+        line = read_last_line(filename)
+        return json.loads(line) if line else None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read previous snapshot from %s: %s", filename, e)
+        return None
+
+def append_snapshot(data, history_dir=DEFAULT_HISTORY_DIR):
+    """Append a snapshot to the profile's history file"""
+    os.makedirs(history_dir, exist_ok=True)
+    with open(history_path(data['scholar_id'], history_dir), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+def history_counts(data):
+    """Map year -> citation count from a snapshot's citation_history"""
+    counts = {}
+    for item in data.get('metrics', {}).get('citation_history', []):
+        try:
+            counts[str(item['year'])] = int(item['citations'])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return counts
+
+def diff_snapshots(previous, current, z_threshold=DEFAULT_Z_THRESHOLD):
+    """Compare two snapshots of one profile and return (flags, deltas)
+
+    flags is a list of short strings:
+    - 'fallback': the new scrape used synthetic or placeholder data
+    - 'regression': a headline metric went down
+    - 'history_rewrite': years disappeared or a year's count went down
+    - 'jump:<year>': a year's count rose by more than z_threshold standard
+      deviations of the previous snapshot's yearly counts
+    deltas maps each headline metric to its change (None when not comparable).
+    """
+    flags = []
+
+    if current.get('fallback'):
+        flags.append('fallback')
+
+    if previous is None:
+        return flags, {}
+
+    previous_metrics = headline_metrics(previous)
+    current_metrics = headline_metrics(current)
+    deltas = {}
+    for key, old in previous_metrics.items():
+        new = current_metrics[key]
+        deltas[key] = new - old if old is not None and new is not None else None
+
+    if any(delta is not None and delta < 0 for delta in deltas.values()):
+        flags.append('regression')
+
+    # Synthetic history says nothing about the real one, so don't compare it
+    if previous.get('fallback') or current.get('fallback'):
+        return flags, deltas
+
+    previous_counts = history_counts(previous)
+    current_counts = history_counts(current)
+
+    # Scholar's chart drops its oldest years over time, so only years still in range count
+    first_year = min(current_counts, default=None)
+    if any((year not in current_counts and first_year is not None and year >= first_year)
+           or current_counts.get(year, count) < count
+           for year, count in previous_counts.items()):
+        flags.append('history_rewrite')
+
+    # Measure each year's change in units of the spread of the previous yearly counts;
+    # a newly added year is compared with the latest previous year
+    if len(previous_counts) >= 2:
+        stdev = statistics.pstdev(previous_counts.values())
+        latest = previous_counts[max(previous_counts)]
+        if stdev > 0:
+            for year, count in sorted(current_counts.items()):
+                if (count - previous_counts.get(year, latest)) / stdev > z_threshold:
+                    flags.append(f"jump:{year}")
+
+    return flags, deltas
+
+def review_snapshot(data, history_dir=DEFAULT_HISTORY_DIR, change_log=DEFAULT_CHANGE_LOG,
+                    z_threshold=DEFAULT_Z_THRESHOLD, accept_anomalies=False,
+                    confirm_runs=DEFAULT_CONFIRM_RUNS):
+    """Diff a new scrape against the previous snapshot and record the outcome
+
+    Appends a compact record to change_log whenever a headline metric changed
+    or something was flagged. Accepted snapshots are appended to the history;
+    blocked ones are not, so the next run still compares against the last good
+    data. A regression or history rewrite seen on confirm_runs consecutive
+    runs is accepted as real (0 never accepts it). Fallback data only blocks
+    when the previous snapshot holds real data; otherwise it is saved with
+    the flag recorded. Returns True if the scrape may replace the saved data.
+    """
+    scholar_id = data['scholar_id']
+    previous = load_previous_snapshot(scholar_id, history_dir)
+    flags, deltas = diff_snapshots(previous, data, z_threshold)
+
+    blocking = [flag for flag in flags if flag in BLOCKING_FLAGS]
+    if previous is None or previous.get('fallback'):
+        blocking = [flag for flag in blocking if flag != 'fallback']
+    accepted = accept_anomalies or not blocking
+
+    # Count consecutive runs whose only blocking flags are confirmable
+    pending = None
+    if blocking and all(flag in CONFIRMABLE_FLAGS for flag in blocking):
+        pending = load_pending(scholar_id, history_dir) or {'first_seen_at': data.get('updated_at'), 'runs': 0}
+        pending['runs'] += 1
+        pending['flags'] = blocking
+        if not accepted and confirm_runs > 0 and pending['runs'] >= confirm_runs:
+            logger.warning("Accepting %s for %s after %s consecutive runs", ', '.join(blocking), scholar_id,
+                           pending['runs'])
+            flags.append('confirmed')
+            accepted = True
+    save_pending(scholar_id, None if accepted else pending, history_dir)
+
+    if flags:
+        logger.warning("Anomalies for %s: %s", scholar_id, ', '.join(flags))
+    if not accepted:
+        logger.error("Keeping previous data for %s, new scrape flagged as %s", scholar_id, ', '.join(blocking))
+
+    changed = any(deltas.values()) or previous is None
+    if flags or changed:
+        record = {
+            'scholar_id': scholar_id,
+            'updated_at': data.get('updated_at'),
+            'previous_updated_at': previous.get('updated_at') if previous else None,
+            'deltas': deltas,
+            'flags': flags,
+            'accepted': accepted
+        }
+        os.makedirs(os.path.dirname(change_log) or '.', exist_ok=True)
+        with open(change_log, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    if accepted:
+        append_snapshot(data, history_dir)
+
+    return accepted
@@ -0,0 +1,49 @@
+"""Helpers for reading the stats dicts produced by get_scholar_stats()
+
+Also holds the sorted (value, scholar_id) metric columns shared by the search
+index and the group rollups.
+"""
+import bisect
+import datetime
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def parse_metric(value):
+    """Convert a scraped metric such as '1,234' to an int, or None for 'N/A'"""
+    try:
+        return int(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+def headline_metrics(data):
+    """Return the all-time citations, h-index and i10-index of a stats dict as ints"""
+    citation_stats = data.get('metrics', {}).get('citation_stats', {})
+    return {
+        'citations': parse_metric(citation_stats.get('Citations', {}).get('all')),
+        'h_index': parse_metric(citation_stats.get('h-index', {}).get('all')),
+        'i10_index': parse_metric(citation_stats.get('i10-index', {}).get('all'))
+    }
+
+def parse_updated_at(data):
+    """Parse the 'updated_at' timestamp written by get_scholar_stats()"""
+    try:
+        return datetime.datetime.strptime(data.get('updated_at', ''), TIMESTAMP_FORMAT)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def load_column(entries):
+    """Turn a sorted metric column read from JSON back into (value, scholar_id) tuples
+
+    JSON stores the entries as lists; bisect needs comparable tuples.
+    """
+    return [tuple(entry) for entry in entries]
+
+def insert_into_column(values, value, scholar_id):
+    """Insert (value, scholar_id) into a sorted column"""
+    bisect.insort(values, (value, scholar_id))
+
+def remove_from_column(values, value, scholar_id):
+    """Remove (value, scholar_id) from a sorted column if present"""
+    position = bisect.bisect_left(values, (value, scholar_id))
+    if position < len(values) and values[position] == (value, scholar_id):
+        values.pop(position)
@@ -0,0 +1,107 @@
+"""Incremental capture of the headline parts of a Scholar profile page
+
+The name, affiliation, interests, the gsc_rsb_st stats table and the citation
+histogram all sit near the top of the page; the publication table and most of
+the script and markup come after them. ProfileHeadCapture is fed the response
+body chunk by chunk and reports as soon as all three sections have been closed,
+so the caller can stop reading and hand only that prefix to the parser. The
+prefix always ends right after the last section's closing tag, wherever the
+network happened to split the chunks, so identical pages give identical prefixes.
+"""
+import codecs
+from html.parser import HTMLParser
+
+# Elements that never get a closing tag
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'source', 'track', 'wbr'
+))
+
+# Sections needed for a headline refresh: (tag, attribute, value)
+HEAD_SECTIONS = {
+    'profile': ('div', 'id', 'gsc_prf_i'),
+    'stats': ('table', 'id', 'gsc_rsb_st'),
+    'histogram': ('div', 'class', 'gsc_md_hist_b'),
+}
+
+class ProfileHeadCapture(HTMLParser):
+    """HTMLParser that tracks when each of HEAD_SECTIONS has been fully read"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.open_sections = {}
+        self.captured = set()
+        # getpos() of the end tag that closed the last section
+        self.end_position = None
+
+    @property
+    def complete(self):
+        """Whether every section in HEAD_SECTIONS has been closed"""
+        return len(self.captured) == len(HEAD_SECTIONS)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+
+        attrs = dict(attrs)
+        for name, (section_tag, attribute, value) in HEAD_SECTIONS.items():
+            if name in self.captured or name in self.open_sections or tag != section_tag:
+                continue
+            if value in (attrs.get(attribute) or '').split():
+                self.open_sections[name] = len(self.stack)
+
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+
+        # Pop implicitly closed elements along with the matching one
+        while self.stack:
+            if self.stack.pop() == tag:
+                break
+
+        for name, depth in list(self.open_sections.items()):
+            if len(self.stack) <= depth:
+                del self.open_sections[name]
+                self.captured.add(name)
+                if self.complete and self.end_position is None:
+                    self.end_position = self.getpos()
+
+def _end_of_tag(text, position):
+    """Index just past the tag that starts at an HTMLParser (lineno, column) position"""
+    lineno, column = position
+    start = 0
+    for _ in range(lineno - 1):
+        start = text.index('\n', start) + 1
+    return text.index('>', start + column) + 1
+
+def read_profile_head(chunks, encoding='utf-8'):
+    """Consume byte chunks until the headline sections are captured
+
+    Returns (html, complete, truncated): the decoded text, whether all sections
+    were found, and whether the page continues past the returned text. When
+    complete, html ends at the closing tag of the last section. The caller is
+    expected to close the underlying connection once this returns.
+    """
+    chunks = iter(chunks)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    capture = ProfileHeadCapture()
+    parts = []
+
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        parts.append(text)
+        capture.feed(text)
+        if capture.complete:
+            break
+    else:
+        parts.append(decoder.decode(b'', final=True))
+        return ''.join(parts), capture.complete, False
+
+    html = ''.join(parts)
+    end = _end_of_tag(html, capture.end_position)
+    # The section closed exactly at a chunk boundary: peek whether the page goes on
+    truncated = end < len(html) or any(chunk for chunk in chunks)
+    return html[:end], True, truncated
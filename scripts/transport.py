@@ -0,0 +1,236 @@
+"""HTTP transport backends behind the fetch strategies
+
+get_html_content() and friends talk to a transport instead of calling
+requests directly:
+
+- RequestsTransport: requests over HTTP/1.1, the default.
+- HttpxTransport: an httpx.AsyncClient with HTTP/2 running on a background
+  event loop. All callers share one client, so concurrent fetches from
+  pipeline worker threads are multiplexed over a few connections instead of
+  opening a socket each. Requires `pip install httpx[http2]`.
+
+Both backends only advertise the content encodings they can actually decode.
+HttpxTransport also drops connection-specific headers such as Connection,
+which HTTP/2 forbids.
+"""
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ('requests', 'httpx')
+
+# Connection-specific headers that HTTP/2 rejects (RFC 9113, section 8.2.2)
+HOP_BY_HOP_HEADERS = frozenset(('connection', 'keep-alive', 'proxy-connection', 'upgrade', 'transfer-encoding'))
+
+class TransportError(Exception):
+    """A request failed before a response was received"""
+
+class TransportHTTPError(TransportError):
+    """The server answered with an error status"""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} for {response.url}")
+        self.response = response
+
+class Response:
+    """Backend-neutral response: status_code, url, encoding, text and/or a chunk iterator"""
+
+    def __init__(self, status_code, url, text=None, encoding=None, chunks=None):
+        self.status_code = status_code
+        self.url = url
+        self.text = text
+        self.encoding = encoding
+        self.chunks = chunks
+
+    def raise_for_status(self):
+        """Raise TransportHTTPError for 4xx and 5xx responses"""
+        if self.status_code >= 400:
+            raise TransportHTTPError(self)
+
+def accept_encoding():
+    """Accept-Encoding value listing only the encodings installed decoders can handle"""
+    encodings = ['gzip', 'deflate']
+
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        encodings.append('br')
+        break
+
+    return ', '.join(encodings)
+
+def with_accept_encoding(headers):
+    """Copy of headers with Accept-Encoding limited to what we can decode"""
+    headers = dict(headers or {})
+    headers['Accept-Encoding'] = accept_encoding()
+    return headers
+
+def http2_headers(headers):
+    """with_accept_encoding(headers) without the headers HTTP/2 forbids"""
+    return {name: value for name, value in with_accept_encoding(headers).items()
+            if name.lower() not in HOP_BY_HOP_HEADERS}
+
+class RequestsTransport:
+    """Blocking transport using requests (HTTP/1.1, one connection per request)"""
+
+    name = 'requests'
+
+    def __init__(self, session=None):
+        import requests
+        import urllib3
+
+        # Disable SSL warnings (use with caution in production)
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self._requests = requests
+        self._session = session
+
+    def _get(self, url, headers, timeout, stream=False):
+        getter = self._session.get if self._session else self._requests.get
+        try:
+            return getter(url, headers=with_accept_encoding(headers), timeout=timeout,
+                           verify=False, stream=stream)
+        except self._requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+
+    def get(self, url, headers=None, timeout=30):
+        """GET url and return a Response with the decoded body in .text"""
+        response = self._get(url, headers, timeout)
+        return Response(response.status_code, response.url, text=response.text,
+                        encoding=response.encoding)
+
+    @contextmanager
+    def stream(self, url, headers=None, timeout=30, chunk_size=16384):
+        """GET url and yield a Response whose .chunks iterates over the body; closes on exit"""
+        response = self._get(url, headers, timeout, stream=True)
+
+        def chunks():
+            try:
+                yield from response.iter_content(chunk_size=chunk_size)
+            except self._requests.exceptions.RequestException as e:
+                raise TransportError(str(e)) from e
+
+        try:
+            yield Response(response.status_code, response.url, encoding=response.encoding,
+                           chunks=chunks())
+        finally:
+            response.close()
+
+    def session(self, headers=None):
+        """A transport that keeps cookies across requests"""
+        session = self._requests.Session()
+        session.headers.update(with_accept_encoding(headers))
+        session.verify = False
+        return RequestsTransport(session)
+
+    def close(self):
+        if self._session:
+            self._session.close()
+
+class HttpxTransport:
+    """HTTP/2 transport on a shared httpx.AsyncClient, usable from any thread
+
+    Requests are submitted to an event loop running in a background thread, so
+    synchronous callers (the strategy cascade, pipeline fetch workers) can share
+    one multiplexed client without becoming async themselves.
+    """
+
+    name = 'httpx'
+
+    def __init__(self, max_connections=4, loop=None, headers=None):
+        try:
+            import httpx
+            import h2  # noqa: F401 - required for http2=True
+        except ImportError as e:
+            raise TransportError("The httpx transport needs `pip install httpx[http2]`") from e
+
+        self._httpx = httpx
+        self._owns_loop = loop is None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='httpx-transport', daemon=True).start()
+        self._loop = loop
+
+        async def create_client():
+            return httpx.AsyncClient(
+                http2=True,
+                verify=False,
+                headers=http2_headers(headers),
+                limits=httpx.Limits(max_connections=max_connections),
+                follow_redirects=True
+            )
+
+        self._client = self._run(create_client())
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def get(self, url, headers=None, timeout=30):
+        """GET url and return a Response with the decoded body in .text"""
+        try:
+            response = self._run(self._client.get(url, headers=http2_headers(headers), timeout=timeout))
+        except self._httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+        return Response(response.status_code, str(response.url), text=response.text,
+                        encoding=response.encoding)
+
+    @contextmanager
+    def stream(self, url, headers=None, timeout=30, chunk_size=16384):
+        """GET url and yield a Response whose .chunks iterates over the body; closes on exit"""
+        request = self._client.stream('GET', url, headers=http2_headers(headers), timeout=timeout)
+        try:
+            response = self._run(request.__aenter__())
+        except self._httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+        body = response.aiter_bytes(chunk_size)
+
+        def chunks():
+            while True:
+                try:
+                    yield self._run(body.__anext__())
+                except StopAsyncIteration:
+                    return
+                except self._httpx.HTTPError as e:
+                    raise TransportError(str(e)) from e
+
+        try:
+            yield Response(response.status_code, str(response.url), encoding=response.encoding,
+                           chunks=chunks())
+        finally:
+            self._run(request.__aexit__(None, None, None))
+
+    def session(self, headers=None):
+        """A transport with its own cookie jar on the same event loop"""
+        return HttpxTransport(loop=self._loop, headers=headers)
+
+    def close(self):
+        self._run(self._client.aclose())
+        if self._owns_loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+_default_transport = None
+
+def create_transport(name='requests'):
+    """Create a transport backend by name ('requests' or 'httpx')"""
+    if name == 'requests':
+        return RequestsTransport()
+    if name == 'httpx':
+        return HttpxTransport()
+    raise ValueError(f"Unknown transport {name!r}, expected one of {', '.join(TRANSPORTS)}")
+
+def get_default_transport():
+    """The shared transport used when a caller doesn't pass one, created on first use"""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = RequestsTransport()
+    return _default_transport
+
+def set_default_transport(transport):
+    """Replace the shared default transport, e.g. with one chosen on the command line"""
+    global _default_transport
+    _default_transport = transport
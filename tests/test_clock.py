@@ -0,0 +1,101 @@
+"""Fetch cascade timing under a VirtualClock with a stub transport
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from clock import VirtualClock
+from get_scholar_stats import get_html_content
+from transport import Response
+
+URL = "https://scholar.google.com/citations?user=abc123&hl=en"
+
+class StubTransport:
+    """Answers each GET with the next status from `statuses`"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=30):
+        self.requests.append(url)
+        status = self.statuses.pop(0)
+        return Response(status, url, text=f"<html>{status}</html>")
+
+    def session(self, headers=None):
+        return self
+
+    def close(self):
+        pass
+
+class FetchCascadeTest(unittest.TestCase):
+
+    def test_direct_success_sleeps_once(self):
+        clock = VirtualClock()
+        statuses = []
+        html = get_html_content(URL, clock, StubTransport([200]), statuses)
+
+        self.assertEqual(html, "<html>200</html>")
+        self.assertEqual(clock.schedule, [(0.0, 2)])
+        self.assertEqual(statuses, [200])
+
+    def test_blocked_direct_falls_back_to_session(self):
+        clock = VirtualClock(seed=1)
+        expected_wait = VirtualClock(seed=1).uniform(5, 10)
+        # Strategy 1 is blocked; strategy 2 visits the home page, then the profile
+        transport = StubTransport([403, 200, 200])
+        statuses = []
+        html = get_html_content(URL, clock, transport, statuses)
+
+        self.assertEqual(html, "<html>200</html>")
+        self.assertEqual(clock.schedule, [(0.0, 2), (2.0, expected_wait)])
+        self.assertEqual(statuses, [403, 200])
+        self.assertEqual(transport.requests, [URL, 'https://scholar.google.com/', URL])
+
+    def test_not_found_ends_cascade(self):
+        clock = VirtualClock()
+        transport = StubTransport([404])
+        statuses = []
+
+        self.assertIsNone(get_html_content(URL, clock, transport, statuses))
+        self.assertEqual(clock.total_slept, 2)
+        self.assertEqual(statuses, [404])
+        self.assertEqual(len(transport.requests), 1)
+
+    def test_blocked_session_ends_cascade(self):
+        clock = VirtualClock(seed=7)
+        session_wait = VirtualClock(seed=7).uniform(5, 10)
+        transport = StubTransport([403, 200, 403])
+        statuses = []
+
+        self.assertIsNone(get_html_content(URL, clock, transport, statuses))
+        # Strategy 2 gives up on its 403, so strategy 3 never sleeps
+        self.assertEqual(clock.schedule, [(0.0, 2), (2.0, session_wait)])
+        self.assertEqual(statuses, [403, 403])
+
+class VirtualClockThreadingTest(unittest.TestCase):
+
+    def test_concurrent_sleeps_are_all_recorded(self):
+        clock = VirtualClock()
+
+        def worker():
+            for _ in range(1000):
+                clock.sleep(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(clock.schedule), 8000)
+        self.assertEqual(clock.now(), 8000)
+        self.assertEqual(sorted(start for start, _ in clock.schedule), [float(i) for i in range(8000)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Snapshot history compaction: incremental runs and change points
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import json
+import shutil
+import datetime
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from compaction import compact_history, compact_snapshots, cutoffs
+from snapshot_diff import append_snapshot, history_path
+from stats_utils import TIMESTAMP_FORMAT
+
+START = datetime.datetime(2024, 1, 1, 6, 0)
+
+def snapshot(day, citations):
+    return {
+        'scholar_id': 'abc123',
+        'updated_at': (START + datetime.timedelta(days=day)).strftime(TIMESTAMP_FORMAT),
+        'metrics': {'citation_stats': {'Citations': {'all': str(citations)}}, 'citation_history': []}
+    }
+
+def citations_on(day):
+    # Counts change every 10 days, so most daily snapshots are duplicates
+    return 100 + day // 10
+
+def read_history(history_dir):
+    with open(history_path('abc123', history_dir), 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+class CompactionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_incremental_runs_match_compacting_from_scratch(self):
+        days = 500
+        end = START + datetime.timedelta(days=days)
+
+        from_scratch = os.path.join(self.directory, 'from_scratch')
+        for day in range(days):
+            append_snapshot(snapshot(day, citations_on(day)), from_scratch)
+        compact_history(from_scratch, now=end)
+        expected = read_history(from_scratch)
+        self.assertLess(len(expected), days)
+
+        # Daily scrapes with compaction every `interval` days
+        for interval in (1, 7, 31):
+            with self.subTest(interval=interval):
+                incremental = os.path.join(self.directory, f'incremental_{interval}')
+                for day in range(days):
+                    append_snapshot(snapshot(day, citations_on(day)), incremental)
+                    if day % interval == interval - 1:
+                        compact_history(incremental, now=START + datetime.timedelta(days=day, hours=1))
+                compact_history(incremental, now=end)
+
+                self.assertEqual(read_history(incremental), expected)
+
+    def test_unchanged_cutoffs_skip_profiles(self):
+        history_dir = os.path.join(self.directory, 'history')
+        for day in range(100):
+            append_snapshot(snapshot(day, citations_on(day)), history_dir)
+        now = START + datetime.timedelta(days=100)
+
+        self.assertEqual(compact_history(history_dir, now=now)['profiles'], 1)
+        self.assertEqual(compact_history(history_dir, now=now)['skipped'], 1)
+
+    def test_change_points_survive_downsampling(self):
+        now = START + datetime.timedelta(days=500)
+        weekly_cutoff, monthly_cutoff = cutoffs(now)
+        snapshots = [snapshot(day, citations_on(day)) for day in range(500)]
+
+        kept = compact_snapshots(snapshots, weekly_cutoff, monthly_cutoff)
+
+        # Every distinct value still appears, starting on the day it first changed
+        first_seen = {}
+        for data in snapshots:
+            first_seen.setdefault(data['metrics']['citation_stats']['Citations']['all'], data['updated_at'])
+        kept_times = {data['updated_at'] for data in kept}
+        self.assertTrue(set(first_seen.values()) <= kept_times)
+
+        # Old snapshots are thinned out, recent ones are all kept
+        old = [data for data in kept if data['updated_at'] < monthly_cutoff.strftime(TIMESTAMP_FORMAT)]
+        recent = [data for data in snapshots if data['updated_at'] >= weekly_cutoff.strftime(TIMESTAMP_FORMAT)]
+        self.assertLess(len(old), sum(1 for data in snapshots
+                                      if data['updated_at'] < monthly_cutoff.strftime(TIMESTAMP_FORMAT)))
+        self.assertTrue(all(data in kept for data in recent))
+
+if __name__ == '__main__':
+    unittest.main()
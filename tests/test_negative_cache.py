@@ -0,0 +1,52 @@
+"""Negative cache backoff, in particular for IP-wide blocks
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import datetime
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from negative_cache import (CLASS_MAX_RECHECK_HOURS, QUARANTINE_AFTER, is_quarantined, record_failure,
+                            record_result)
+
+NOW = datetime.datetime(2026, 1, 1)
+
+class NegativeCacheTest(unittest.TestCase):
+
+    def test_not_found_quarantines_immediately(self):
+        cache = {}
+        record_failure(cache, 'abc123', 'not_found', NOW)
+        self.assertTrue(is_quarantined(cache, 'abc123', NOW))
+
+    def test_blocked_needs_consecutive_failures(self):
+        cache = {}
+        for _ in range(QUARANTINE_AFTER['blocked'] - 1):
+            record_failure(cache, 'abc123', 'blocked', NOW)
+            self.assertFalse(is_quarantined(cache, 'abc123', NOW))
+        record_failure(cache, 'abc123', 'blocked', NOW)
+        self.assertTrue(is_quarantined(cache, 'abc123', NOW))
+
+    def test_blocked_backoff_is_capped(self):
+        cache = {}
+        for _ in range(20):
+            record_failure(cache, 'abc123', 'blocked', NOW)
+        cap = NOW + datetime.timedelta(hours=CLASS_MAX_RECHECK_HOURS['blocked'])
+        self.assertFalse(is_quarantined(cache, 'abc123', cap))
+
+    def test_blocked_result_can_be_deferred(self):
+        cache = {}
+        failure_class = record_result(cache, 'abc123', [403, 403], None, NOW, record_blocked=False)
+        self.assertEqual(failure_class, 'blocked')
+        self.assertEqual(cache, {})
+
+    def test_success_clears_entry(self):
+        cache = {}
+        record_failure(cache, 'abc123', 'not_found', NOW)
+        record_result(cache, 'abc123', [200], {'profile': {'name': 'Test Scholar'}}, NOW)
+        self.assertEqual(cache, {})
+
+if __name__ == '__main__':
+    unittest.main()
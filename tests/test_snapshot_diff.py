@@ -0,0 +1,93 @@
+"""Change detection: fallback handling and the --confirm-runs counter
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from snapshot_diff import load_pending, load_previous_snapshot, pending_path, review_snapshot
+
+def snapshot(citations, history=None, fallback=None, updated_at='2026-01-01 00:00:00'):
+    data = {
+        'scholar_id': 'abc123',
+        'updated_at': updated_at,
+        'profile': {'name': 'Test Scholar'},
+        'metrics': {
+            'citation_stats': {'Citations': {'all': str(citations)}},
+            'citation_history': [{'year': year, 'citations': count}
+                                 for year, count in (history or {}).items()]
+        }
+    }
+    if fallback:
+        data['fallback'] = fallback
+    return data
+
+class ReviewSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.history_dir = os.path.join(self.directory, 'history')
+        self.change_log = os.path.join(self.directory, 'changes.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def review(self, data, **kwargs):
+        return review_snapshot(data, self.history_dir, self.change_log, **kwargs)
+
+    def change_records(self):
+        with open(self.change_log, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_fallback_without_previous_snapshot_is_saved(self):
+        self.assertTrue(self.review(snapshot(100, fallback='citation_history')))
+        self.assertEqual(load_previous_snapshot('abc123', self.history_dir)['fallback'], 'citation_history')
+        self.assertEqual(self.change_records()[-1]['flags'], ['fallback'])
+        self.assertTrue(self.change_records()[-1]['accepted'])
+
+    def test_fallback_after_fallback_is_saved(self):
+        self.assertTrue(self.review(snapshot(100, fallback='citation_history')))
+        self.assertTrue(self.review(snapshot(110, fallback='citation_history')))
+
+    def test_fallback_does_not_replace_real_data(self):
+        self.assertTrue(self.review(snapshot(100, {'2024': 40, '2025': 60})))
+        self.assertFalse(self.review(snapshot(100, fallback='citation_history')))
+        self.assertNotIn('fallback', load_previous_snapshot('abc123', self.history_dir))
+
+    def test_regression_accepted_after_confirm_runs(self):
+        self.assertTrue(self.review(snapshot(100)))
+
+        self.assertFalse(self.review(snapshot(90), confirm_runs=3))
+        self.assertEqual(load_pending('abc123', self.history_dir)['runs'], 1)
+        self.assertFalse(self.review(snapshot(91), confirm_runs=3))
+        self.assertEqual(load_pending('abc123', self.history_dir)['runs'], 2)
+
+        self.assertTrue(self.review(snapshot(92), confirm_runs=3))
+        self.assertIn('confirmed', self.change_records()[-1]['flags'])
+        self.assertFalse(os.path.exists(pending_path('abc123', self.history_dir)))
+        self.assertEqual(load_previous_snapshot('abc123', self.history_dir)['metrics']['citation_stats'],
+                         {'Citations': {'all': '92'}})
+
+    def test_transient_regression_resets_counter(self):
+        self.assertTrue(self.review(snapshot(100)))
+        self.assertFalse(self.review(snapshot(90), confirm_runs=2))
+        # The drop goes away, so the next one starts counting again
+        self.assertTrue(self.review(snapshot(100), confirm_runs=2))
+        self.assertIsNone(load_pending('abc123', self.history_dir))
+        self.assertFalse(self.review(snapshot(90), confirm_runs=2))
+        self.assertEqual(load_pending('abc123', self.history_dir)['runs'], 1)
+
+    def test_confirm_runs_zero_never_accepts(self):
+        self.assertTrue(self.review(snapshot(100)))
+        for _ in range(5):
+            self.assertFalse(self.review(snapshot(90), confirm_runs=0))
+        self.assertEqual(load_pending('abc123', self.history_dir)['runs'], 5)
+
+if __name__ == '__main__':
+    unittest.main()